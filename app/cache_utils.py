@@ -4,20 +4,16 @@
 We cache the *canonical* (GPT‑normalized) version of a user's sentence
 along with its classified intent.  Subsequent requests that hash to the
 same canonical value skip the LLM call entirely.
+
+Entries live in the configured storage backend (``app/storage``): the
+``intent_cache.jsonl`` file for Mongo, a table for the embedded backend.
 """
 
 from __future__ import annotations
 
 import hashlib
-import json
-import pathlib
 import re
-import time
-from typing import Dict, Optional
-
-# JSONL file lives at repo‑root/intent_cache.jsonl, easy to inspect.
-CACHE_FILE = pathlib.Path(__file__).resolve().parents[1] / "intent_cache.jsonl"
-CACHE_FILE.touch(exist_ok=True)
+from typing import Dict, Iterable, Optional
 
 # ───────────────────────────────── canonicalisation ───────────────────────────
 _STOP_WORDS = {"please", "kindly", "just"}
@@ -37,12 +33,9 @@ def _key(text: str) -> str:
     return hashlib.sha1(_canonicalize(text).encode()).hexdigest()
 
 
-def _iter_cache():
-    with open(CACHE_FILE, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if line:
-                yield json.loads(line)
+def _cache():
+    from .storage import get_storage   # lazy: storage backends import _key
+    return get_storage().intent_cache
 
 # Public API
 # ----------
@@ -50,27 +43,19 @@ def _iter_cache():
 def load_from_cache(text: str) -> Optional[Dict]:
     """Return cache entry if present; else ``None``.
 
-    Increments *hits* and *last_used* in‑memory for basic LRU stats (not
-    flushed back to disk; lightweight).
+    Increments *hits* and *last_used* for basic LRU stats.
+    """
+    return _cache().load(text)
+
+
+def load_many_from_cache(texts: Iterable[str]) -> Dict[str, Dict]:
+    """Batch variant of :func:`load_from_cache`.
+
+    Returns ``{text: entry}`` for every *text* that has a cache entry.
     """
-    k = _key(text)
-    for doc in _iter_cache():
-        if doc["key"] == k:
-            doc["hits"] += 1
-            doc["last_used"] = time.time()
-            return doc
-    return None
+    return _cache().load_many(texts)
 
 
 def save_to_cache(raw_text: str, canonical: str, analysis: str, intent: str) -> None:
-    """Append a new JSON line to the cache file."""
-    doc = {
-        "key": _key(raw_text),
-        "canonical": canonical,
-        "analysis": analysis,
-        "intent": intent,
-        "hits": 1,
-        "last_used": time.time(),
-    }
-    with open(CACHE_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    """Store a new cache entry."""
+    _cache().save(raw_text, canonical, analysis, intent)
@@ -9,6 +9,38 @@ YELP_API_KEY = os.getenv("YELP_API_KEY")
 MONGO_URI    = os.getenv("MONGO_URI", "mongodb://localhost:27017/")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
+# Storage backend (app/storage): "mongo" (default) or "sqlite" (embedded, no server)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+SQLITE_PATH     = os.getenv("SQLITE_PATH", str(pathlib.Path(__file__).resolve().parents[1] / "chatdb.sqlite3"))
+
+# Batch search (/search/batch) tuning
+BATCH_LLM_CHUNK = int(os.getenv("BATCH_LLM_CHUNK", "20"))   # queries per multi-item GPT prompt
+YELP_FANOUT     = int(os.getenv("YELP_FANOUT", "4"))        # concurrent Yelp requests
+# USD per 1K tokens for the batch prompts (gpt-3.5-turbo-1106 list price); cost is an estimate
+LLM_PRICE_PROMPT_PER_1K     = float(os.getenv("LLM_PRICE_PROMPT_PER_1K", "0.001"))
+LLM_PRICE_COMPLETION_PER_1K = float(os.getenv("LLM_PRICE_COMPLETION_PER_1K", "0.002"))
+
+# Restaurant cache freshness & background warming (app/warmer.py)
+RESTAURANT_TTL_HOURS = float(os.getenv("RESTAURANT_TTL_HOURS", "24"))  # older docs are stale
+WARM_ENABLED         = os.getenv("WARM_ENABLED", "1") == "1"
+WARM_INTERVAL_S      = int(os.getenv("WARM_INTERVAL_S", "600"))        # seconds between passes
+WARM_TOP_N           = int(os.getenv("WARM_TOP_N", "20"))              # pairs mined per pass
+WARM_LOOKBACK_HOURS  = int(os.getenv("WARM_LOOKBACK_HOURS", "72"))     # demand window
+YELP_RATE_PER_MIN    = int(os.getenv("YELP_RATE_PER_MIN", "30"))       # background Yelp budget
+
+# Outbound LLM scheduling (app/llm.py)
+LLM_MAX_CONCURRENCY     = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))        # calls in flight
+LLM_RATE_PER_MIN        = int(os.getenv("LLM_RATE_PER_MIN", "60"))          # token bucket size / minute
+LLM_DEBOUNCE_S          = float(os.getenv("LLM_DEBOUNCE_S", "2"))           # per-session repeat window
+LLM_DEADLINE_INTERACTIVE_S = float(os.getenv("LLM_DEADLINE_INTERACTIVE_S", "8"))  # classify / parse
+LLM_DEADLINE_SUMMARY_S     = float(os.getenv("LLM_DEADLINE_SUMMARY_S", "2"))      # summaries / follow-ups
+LLM_DEADLINE_BATCH_S       = float(os.getenv("LLM_DEADLINE_BATCH_S", "120"))      # /search/batch prompts
+
+# Conversation retention (app/history.py)
+CONVERSATION_RETENTION_DAYS = int(os.getenv("CONVERSATION_RETENTION_DAYS", "30"))  # older turns → rollups
+RETENTION_INTERVAL_S        = int(os.getenv("RETENTION_INTERVAL_S", "3600"))       # seconds between passes
+ROLLUP_RECENT_INPUTS        = int(os.getenv("ROLLUP_RECENT_INPUTS", "20"))         # inputs kept per rollup
+
 
 print("OPENAI_API_KEY in environment variables：", os.environ.get("OPENAI_API_KEY"))
 print("✅ YELP_API_KEY =", YELP_API_KEY)
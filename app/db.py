@@ -1,5 +1,6 @@
-from pymongo import MongoClient, ASCENDING
+from pymongo import MongoClient, ASCENDING, DESCENDING
 from .config import MONGO_URI
+from .query import SEARCH_TOPK_INDEX, SEARCH_TOPK_INDEX_NAME
 
 client = MongoClient(MONGO_URI)
 db = client["yelp_cache_db"]
@@ -11,6 +12,8 @@ coll = db["restaurants"]
 coll.create_index([("location", ASCENDING)])
 coll.create_index([("categories", ASCENDING)])
 coll.create_index([("rating", ASCENDING)])
+# serves app/query.py: equality → top-k sort → rating bound / price filter on keys
+coll.create_index(SEARCH_TOPK_INDEX, name=SEARCH_TOPK_INDEX_NAME)
 
 # 2. User wishlist
 wishlist_coll = db["wishlists"]
@@ -19,3 +22,11 @@ wishlist_coll.create_index("restaurant_name")
 # 3. Conversation history (natural language requests, recommendations, follow-ups, etc.)
 conversations_coll = db["conversations"]
 conversations_coll.create_index("timestamp")
+# serves per-session history reads & context lookups (newest first, _id tiebreak)
+conversations_coll.create_index(
+    [("session_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]
+)
+
+# 4. Per-session rollups of archived conversation turns
+rollups_coll = db["conversation_rollups"]
+rollups_coll.create_index("session_id", unique=True)
@@ -0,0 +1,96 @@
+"""Conversation storage: paginated history reads and bounded retention.
+
+Turns are stored with native ``datetime`` timestamps and read newest‑first
+through the (session_id, timestamp, _id) index with keyset pagination.
+Turns older than ``CONVERSATION_RETENTION_DAYS`` are folded into one compact
+document per session in ``conversation_rollups`` and then deleted, so the
+live collection stays bounded.
+"""
+
+from __future__ import annotations
+
+import datetime
+import threading
+import time
+
+from .config import (
+    CONVERSATION_RETENTION_DAYS,
+    RETENTION_INTERVAL_S,
+    ROLLUP_RECENT_INPUTS,
+)
+from .storage import get_storage
+
+# ───────────────────────────── history reads ─────────────────────────────
+
+def _cursor(doc: dict) -> str:
+    return f"{doc['timestamp'].isoformat()}_{doc['_id']}"
+
+
+def history_page(session_id: str, before: str | None = None, limit: int = 10) -> dict:
+    """Return up to *limit* turns of *session_id*, newest first.
+
+    *before* is the ``next`` cursor of a previous page.  Returns
+    ``{"items": [...], "next": cursor | None}``.
+    """
+    keyset = None
+    if before:
+        ts, _, rid = before.rpartition("_")
+        keyset = (datetime.datetime.fromisoformat(ts), rid)
+    docs = get_storage().conversations.page(session_id, keyset, limit)
+    nxt = _cursor(docs[-1]) if len(docs) == limit else None
+    return {"items": docs, "next": nxt}
+
+# ───────────────────────────── retention ─────────────────────────────────
+
+def migrate_timestamps() -> int:
+    """Convert legacy ISO‑string timestamps to native dates (idempotent)."""
+    return get_storage().conversations.migrate_timestamps()
+
+
+def archive_old_turns(
+    older_than_days: int = CONVERSATION_RETENTION_DAYS, batch_size: int = 5000
+) -> dict:
+    """Fold turns older than *older_than_days* into per‑session rollups."""
+    convs = get_storage().conversations
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(days=older_than_days)
+    stats = {"archived": 0, "sessions": 0}
+    sessions: set = set()
+    while True:
+        docs = convs.oldest_before(cutoff, batch_size)
+        if not docs:
+            stats["sessions"] = len(sessions)
+            return stats
+
+        rollups: dict[str, dict] = {}
+        for d in docs:
+            r = rollups.setdefault(
+                d.get("session_id"),
+                {"turns": 0, "first": d["timestamp"], "last": d["timestamp"], "intents": {}, "inputs": []},
+            )
+            r["turns"] += 1
+            r["last"] = d["timestamp"]
+            intent = d.get("intent") or "unknown"
+            r["intents"][intent] = r["intents"].get(intent, 0) + 1
+            if d.get("user_input"):
+                r["inputs"].append(d["user_input"][:200])
+
+        convs.merge_rollups(rollups, ROLLUP_RECENT_INPUTS)
+        convs.delete(d["_id"] for d in docs)
+        stats["archived"] += len(docs)
+        sessions.update(rollups)
+
+
+def _loop(interval: int) -> None:
+    while True:
+        try:
+            print("🗄️ Conversation archive pass:", archive_old_turns())
+        except Exception as e:
+            print("Conversation archive pass failed:", e)
+        time.sleep(interval)
+
+
+def start_retention(interval: int = RETENTION_INTERVAL_S) -> threading.Thread:
+    """Start the archiving loop in a daemon thread."""
+    t = threading.Thread(target=_loop, args=(interval,), name="conversation-retention", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,49 @@
+"""Admission control for every outbound OpenAI chat completion.
+
+All calls go through one :class:`~app.scheduler.LLMScheduler`:
+
+* at most ``LLM_MAX_CONCURRENCY`` calls in flight, paced by a token bucket
+  (``LLM_RATE_PER_MIN``);
+* waiting calls are ordered by priority class, so interactive
+  classification / parsing runs before follow‑ups, summaries and batch jobs;
+* calls carrying a debounce key (session + canonical query) share one
+  in‑flight request and reuse its result for ``LLM_DEBOUNCE_S``;
+* a call whose queue deadline would be exceeded raises
+  :class:`LLMOverloaded` so the caller can answer without the LLM.
+"""
+
+from __future__ import annotations
+
+from typing import Hashable, Optional
+
+from openai import OpenAI
+
+from .config import (
+    LLM_DEADLINE_BATCH_S,
+    LLM_DEADLINE_INTERACTIVE_S,
+    LLM_DEADLINE_SUMMARY_S,
+    LLM_DEBOUNCE_S,
+    LLM_MAX_CONCURRENCY,
+    LLM_RATE_PER_MIN,
+    OPENAI_API_KEY,
+)
+from .scheduler import BATCH, FOLLOWUP, INTERACTIVE, SUMMARY, LLMOverloaded, LLMScheduler
+
+client = OpenAI(api_key=OPENAI_API_KEY)
+
+# Queue deadlines in seconds per priority class.
+DEADLINES = {
+    INTERACTIVE: LLM_DEADLINE_INTERACTIVE_S,
+    FOLLOWUP: LLM_DEADLINE_SUMMARY_S,
+    SUMMARY: LLM_DEADLINE_SUMMARY_S,
+    BATCH: LLM_DEADLINE_BATCH_S,
+}
+
+scheduler = LLMScheduler(LLM_MAX_CONCURRENCY, LLM_RATE_PER_MIN, LLM_DEBOUNCE_S, DEADLINES)
+
+
+def chat(priority: int = INTERACTIVE, key: Optional[Hashable] = None, **kwargs):
+    """``client.chat.completions.create(**kwargs)`` through the scheduler."""
+    return scheduler.submit(
+        lambda: client.chat.completions.create(**kwargs), priority=priority, key=key
+    )
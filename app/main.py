@@ -4,27 +4,42 @@
 from __future__ import annotations
 
 import datetime
+import json
 import re
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 from bson import ObjectId
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
-from openai import OpenAI
 
 from .cache_utils import load_from_cache
-from .config import OPENAI_API_KEY
-from .db import coll, conversations_coll, wishlist_coll
+from . import llm
+from .config import (
+    BATCH_LLM_CHUNK,
+    LLM_PRICE_COMPLETION_PER_1K,
+    LLM_PRICE_PROMPT_PER_1K,
+    WARM_ENABLED,
+    YELP_FANOUT,
+)
+from .history import history_page, migrate_timestamps, start_retention
 from .nlp import (
     classify_query_type,
+    classify_query_types_batch,
     extract_name_from_canonical,
     parse_nl_query,
+    normalize_query,
+    parse_nl_queries_batch,
 )
+from .query import build_restaurant_query, filter_results, price_tiers, yelp_limit
+from .storage import get_storage
+from .warmer import is_stale, refresh_in_background, start_warmer, upsert_yelp
 from .yelp import search_yelp
 
 app = FastAPI(title="Yelp ChatDB Demo")
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 # ─────────────────────────── CORS -----------------------------------------
 app.add_middleware(
@@ -50,7 +65,13 @@ def _sanitize(obj):
     return obj
 
 
-def gpt_summary(results):
+def _template_summary(results) -> str:
+    """Non-LLM summary used when the LLM scheduler sheds the call."""
+    picks = ", ".join(f"{r['name']} ({r['rating']}★)" for r in results[:3])
+    return f"Here are some top picks: {picks}."
+
+
+def gpt_summary(results, session_id=None):
     if not results:
         return "Sorry, I couldn't find any matching restaurants."  # noqa: E501
     lines = "".join(f"- {r['name']} ({r['rating']}★) at {r['address']}\n" for r in results)
@@ -58,15 +79,21 @@ def gpt_summary(results):
         "Write a short friendly recommendation based on these restaurants:\n\n"
         + lines
     )
-    out = client.chat.completions.create(
-        model="gpt-3.5-turbo",
-        messages=[
-            {"role": "system", "content": "You are a helpful restaurant guide."},
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.7,
-        max_tokens=120,
-    )
+    try:
+        out = llm.chat(
+            llm.SUMMARY,
+            key=(session_id, "summary", lines) if session_id else None,
+            model="gpt-3.5-turbo",
+            messages=[
+                {"role": "system", "content": "You are a helpful restaurant guide."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.7,
+            max_tokens=120,
+        )
+    except llm.LLMOverloaded as e:
+        print("Summary shed:", e)
+        return _template_summary(results)
     return out.choices[0].message.content.strip()
 
 
@@ -76,21 +103,40 @@ def extract_wishlist_note(text: str) -> str:
     return m.group(1) if m else ""
 
 
-def _log(session_id, user_text, resp, parsed, intent, results=None):
-    conversations_coll.insert_one(
+def _compact_results(results):
+    """Keep only what history needs from a result list (id, name, rating)."""
+    if not results:
+        return results
+    return [
+        {"id": str(r.get("_id")), "name": r.get("name"), "rating": r.get("rating")}
+        for r in results
+    ]
+
+
+def _log(session_id, user_text, resp, parsed, intent, results=None, source=None):
+    get_storage().conversations.insert(
         {
             "session_id": session_id,
-            "timestamp": datetime.datetime.utcnow().isoformat(),
+            "timestamp": datetime.datetime.utcnow(),
             "user_input": user_text,
             "response": _sanitize(resp),
             "intent": intent,
             "parsed": _sanitize(parsed),
-            "results": _sanitize(results),
+            "results": _compact_results(results),
+            "source": source,
         }
     )
 
 # ─────────────────────────── Routes ---------------------------------------
 
+@app.on_event("startup")
+def _start_background_jobs():
+    migrate_timestamps()
+    start_retention()
+    if WARM_ENABLED:
+        start_warmer()
+
+
 @app.get("/", response_class=HTMLResponse)
 def index():
     with open("frontend.html", "r", encoding="utf-8") as fh:
@@ -98,20 +144,20 @@ def index():
 
 
 @app.post("/search")
-async def search(payload: dict, request: Request):
+def search(payload: dict, request: Request):
     print("Incoming payload:", payload)
     user_text = str(payload.get("query", "")).strip()
     session_id = payload.get("session_id") or str(uuid.uuid4())
     if not user_text:
         raise HTTPException(400, "query required")
 
-    intent = classify_query_type(user_text)
+    intent = classify_query_type(user_text, session_id)
 
     # Early return for non-search intents
     if intent == "chat_history":
-        logs = conversations_coll.find({"session_id": session_id}).sort("timestamp", -1).limit(10)
+        logs = history_page(session_id, limit=10)["items"]
         history = [
-            f"<li><b>{doc['user_input']}</b>: {doc.get('response', '')[:120]}...</li>"
+            f"<li><b>{doc['user_input']}</b>: {str(doc.get('response', ''))[:120]}...</li>"
             for doc in logs if doc.get("response")
         ]
         return {"status": "history", "msg": "<ul>" + "\n".join(history[::-1]) + "</ul>"}
@@ -129,10 +175,7 @@ async def search(payload: dict, request: Request):
         note = extract_wishlist_note(user_text)
 
         parsed = {}
-        last = conversations_coll.find_one(
-            {"session_id": session_id, "parsed.location": {"$exists": True}},
-            sort=[("timestamp", -1)],
-        )
+        last = get_storage().conversations.last_with_location(session_id)
         if last:
             parsed["location"] = last["parsed"].get("location")
 
@@ -148,15 +191,12 @@ async def search(payload: dict, request: Request):
         return {"status": "wishlist", "msg": msg}
 
     # search intent
-    p_res = parse_nl_query(user_text)
+    p_res = parse_nl_query(user_text, session_id)
     print("Parsed GPT Output:", p_res)
     parsed, missing, followup = p_res["parsed"], p_res["missing"], p_res["followup"]
 
     # Context inheritance
-    last = conversations_coll.find_one(
-        {"session_id": session_id, "parsed.location": {"$exists": True}},
-        sort=[("timestamp", -1)],
-    )
+    last = get_storage().conversations.last_with_location(session_id)
     if last:
         for k in ("location", "categories", "rating", "price"):
             parsed.setdefault(k, last["parsed"].get(k))
@@ -166,73 +206,194 @@ async def search(payload: dict, request: Request):
         _log(session_id, user_text, followup, parsed, "clarification")
         return {"status": "incomplete", "followup": followup}
 
-    # Query local MongoDB
-    docs = list(
-        coll.find({"location": parsed.get("location"), "categories": parsed.get("categories")}).limit(5)
-    )
-    print("MongoDB Query:", {"location": parsed.get("location"), "categories": parsed.get("categories")})
-    print("MongoDB Results:", docs)
+    # Query local cache
+    docs = _find_cached(parsed)
+    print("Cache Results:", docs)
     if docs:
-        for d in docs:
-            d["_id"] = str(d["_id"])
-            d.setdefault("img", "https://via.placeholder.com/400x200?text=No+Image")
-            d.setdefault("url", "https://www.yelp.com")
-        summary = gpt_summary(docs)
-        _log(session_id, user_text, summary, parsed, "search", docs)
+        if is_stale(docs):
+            refresh_in_background(parsed)   # serve stale, revalidate in background
+        summary = gpt_summary(docs, session_id)
+        _log(session_id, user_text, summary, parsed, "search", docs, source="mongo")
         return {"status": "complete", "source": "mongo", "summary": summary, "results": docs}
 
     # Yelp fallback
-    yelp = search_yelp(parsed)
+    yelp = search_yelp(parsed, limit=yelp_limit(parsed))
     if not yelp:
         return {"status": "complete", "summary": "No results found.", "results": []}
 
-    cleaned: list[dict] = []
-    for biz in yelp:
-        doc = {
-            "yelp_id": biz["id"],
-            "name": biz["name"],
-            "categories": parsed.get("categories"),
-            "location": parsed.get("location"),
-            "rating": biz.get("rating"),
-            "price": biz.get("price"),
-            "address": ", ".join(biz["location"]["display_address"]),
-            "img": biz.get("image_url", ""),
-            "url": biz.get("url", ""),
-            "lat": biz["coordinates"]["latitude"],
-            "lng": biz["coordinates"]["longitude"],
-        }
-        coll.update_one({"yelp_id": biz["id"]}, {"$set": doc}, upsert=True)
-        stored = coll.find_one({"yelp_id": biz["id"]})
-        if not stored:
+    cleaned = filter_results(upsert_yelp(parsed, yelp), parsed)
+    summary = gpt_summary(cleaned, session_id)
+    _log(session_id, user_text, summary, parsed, "search", cleaned, source="yelp")
+    return {"status": "complete", "summary": summary, "results": cleaned}
+
+
+def _find_cached(parsed: dict) -> list[dict]:
+    """Look up cached restaurants for *parsed* in the local store."""
+    print("Cache Query:", build_restaurant_query(parsed))
+    docs = get_storage().restaurants.top_k(parsed, k=5)
+    for d in docs:
+        d.setdefault("img", "https://via.placeholder.com/400x200?text=No+Image")
+        d.setdefault("url", "https://www.yelp.com")
+    return docs
+
+
+def _bounded_int(payload: dict, name: str, default: int, lo: int, hi: int) -> int:
+    """Read an optional int option from *payload*, clamped to [lo, hi]; 400 if not an int."""
+    value = payload.get(name)
+    if value is None:
+        return max(lo, min(default, hi))
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise HTTPException(400, f"{name} must be an integer")
+    try:
+        value = int(value)
+    except ValueError:
+        raise HTTPException(400, f"{name} must be an integer")
+    return max(lo, min(value, hi))
+
+
+@app.post("/search/batch")
+def search_batch(payload: dict):
+    """Run many search queries in one call (offline jobs).
+
+    Queries are deduplicated by normalized text, classified and parsed in
+    chunked multi-item GPT prompts, answered from Mongo where possible and
+    only the remaining (location, categories) pairs hit Yelp, ``fanout`` at a
+    time.  No per-query summaries are generated.
+
+    ``stats`` reports LLM calls, tokens and ``est_cost_usd`` (tokens priced
+    with ``LLM_PRICE_*_PER_1K``), Yelp calls and per-stage latency.
+    """
+    queries = payload.get("queries")
+    if not isinstance(queries, list) or not queries:
+        raise HTTPException(400, "queries must be a non-empty list")
+    chunk_size = _bounded_int(payload, "chunk_size", BATCH_LLM_CHUNK, 1, 50)
+    fanout = _bounded_int(payload, "fanout", YELP_FANOUT, 1, 16)
+
+    t_start = time.perf_counter()
+    stats = {"llm_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "yelp_calls": 0}
+    latency: dict[str, float] = {}
+
+    texts = [str(q).strip() for q in queries]
+    # Dedupe on case/whitespace-normalized text only: the intent-cache key
+    # folds digits and "$", which would merge different rating/price searches.
+    reps: dict[str, str] = {}                    # normalized text -> representative text
+    for t in texts:
+        if t:
+            reps.setdefault(normalize_query(t), t)
+    uniques = list(reps.values())
+
+    t0 = time.perf_counter()
+    intents = classify_query_types_batch(uniques, chunk_size, stats)
+    latency["classify_ms"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    search_texts = [t for t in uniques if intents.get(t) == "search"]
+    parsed_map = parse_nl_queries_batch(search_texts, chunk_size, stats)
+    latency["parse_ms"] = (time.perf_counter() - t0) * 1000
+
+    answers: dict[str, dict] = {}
+    for t in uniques:
+        if t not in intents:
+            answers[t] = {"status": "unclassified"}
+        elif intents[t] != "search":
+            answers[t] = {"status": "skipped", "intent": intents[t]}
+
+    # Mongo first; group misses by (location, categories, price) so each hits Yelp once
+    t0 = time.perf_counter()
+    misses: dict[tuple, list[str]] = {}
+    mongo_hits = 0
+    for t in search_texts:
+        p = parsed_map.get(t)
+        if p is None:
+            answers[t] = {"status": "unparsed"}
             continue
-        cleaned.append(
-            {
-                "_id": str(stored["_id"]),
-                "name": doc["name"],
-                "rating": doc.get("rating"),
-                "address": doc.get("address"),
-                "price": doc.get("price"),
-                "img": doc["img"] or "https://via.placeholder.com/400x200?text=No+Image",
-                "url": doc["url"] or "https://www.yelp.com",
-                "lat": doc["lat"],
-                "lng": doc["lng"],
-            }
-        )
+        if p["missing"]:
+            answers[t] = {"status": "incomplete", "parsed": p["parsed"], "missing": p["missing"]}
+            continue
+        docs = _find_cached(p["parsed"])
+        if docs:
+            mongo_hits += 1
+            if is_stale(docs):
+                refresh_in_background(p["parsed"])
+            answers[t] = {"status": "complete", "source": "mongo", "parsed": p["parsed"], "results": docs}
+        else:
+            group_key = (
+                p["parsed"]["location"],
+                json.dumps(p["parsed"]["categories"], sort_keys=True),
+                tuple(price_tiers(p["parsed"].get("price"))),
+            )
+            misses.setdefault(group_key, []).append(t)
+    latency["mongo_ms"] = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    if misses:
+        groups = list(misses.values())
+        with ThreadPoolExecutor(max_workers=fanout) as pool:
+            futures = [
+                pool.submit(search_yelp, parsed_map[g[0]]["parsed"], 20)   # filtered per query below
+                for g in groups
+            ]
+        stats["yelp_calls"] = len(groups)
+        for group, fut in zip(groups, futures):
+            try:
+                cleaned = upsert_yelp(parsed_map[group[0]]["parsed"], fut.result())
+            except Exception as e:
+                for t in group:
+                    answers[t] = {"status": "error", "parsed": parsed_map[t]["parsed"], "error": str(e)}
+                continue
+            for t in group:
+                parsed = parsed_map[t]["parsed"]
+                answers[t] = {
+                    "status": "complete",
+                    "source": "yelp",
+                    "parsed": parsed,
+                    "results": filter_results(cleaned, parsed),
+                }
+    latency["yelp_ms"] = (time.perf_counter() - t0) * 1000
+    latency["total_ms"] = (time.perf_counter() - t_start) * 1000
+
+    results = []
+    for q, t in zip(queries, texts):
+        ans = answers.get(reps.get(normalize_query(t), "")) if t else None
+        # docs from _find_cached / upsert_yelp already carry string ids; _sanitize would drop them
+        results.append({"query": q, **(ans or {"status": "invalid", "error": "empty query"})})
 
-    summary = gpt_summary(cleaned)
-    _log(session_id, user_text, summary, parsed, "search", cleaned)
-    return {"status": "complete", "summary": summary, "results": cleaned}
+    return {
+        "results": results,
+        "stats": {
+            "queries": len(queries),
+            "unique": len(uniques),
+            "mongo_hits": mongo_hits,
+            **stats,
+            "est_cost_usd": round(
+                stats["prompt_tokens"] / 1000 * LLM_PRICE_PROMPT_PER_1K
+                + stats["completion_tokens"] / 1000 * LLM_PRICE_COMPLETION_PER_1K,
+                6,
+            ),
+            "latency_ms": {k: round(v, 1) for k, v in latency.items()},
+        },
+    }
+
+
+@app.get("/history")
+def history(session_id: str, before: Optional[str] = None, limit: int = 10):
+    """Keyset‑paginated conversation history; pass ``next`` back as *before*."""
+    try:
+        return history_page(session_id, before, max(1, min(limit, 100)))
+    except ValueError:
+        raise HTTPException(400, "invalid cursor")
 
 
 # ─────────────────── Wishlist helper funcs & routes -----------------------
 
 def _render_wishlist() -> str:
-    items = list(wishlist_coll.find({}))
+    store = get_storage()
+    items = store.wishlists.items()
     if not items:
         return "<i>📭 Your wishlist is currently empty.</i>"
     html_parts: list[str] = []
     for it in items:
-        r = coll.find_one({"_id": it["restaurant_id"]})
+        r = store.restaurants.get(it["restaurant_id"])
         if not r:
             continue
         html_parts.append(
@@ -245,27 +406,26 @@ def _render_wishlist() -> str:
     return "\n".join(html_parts)
 
 
+def _find_restaurant(name: str):
+    found = get_storage().restaurants.find_by_name(name, limit=1)
+    return found[0] if found else None
+
+
 def _wishlist_add(sess, name: str, note: str, parsed, user_input):
-    rest = coll.find_one({"name": {"$regex": name, "$options": "i"}})
+    rest = _find_restaurant(name)
     if not rest:
         msg = f"⚠️ Can't find restaurant named **{name}**."
         _log(sess, user_input, msg, parsed, "wishlist_add")
         return {"status": "wishlist", "msg": msg}
 
-    if wishlist_coll.find_one({"restaurant_id": rest["_id"]}):
+    wishlists = get_storage().wishlists
+    if wishlists.find(rest["_id"]):
         return {
             "status": "wishlist",
             "msg": f"⚠️ {rest['name']} is already in your wishlist."
         }
 
-    wishlist_coll.insert_one(
-        {
-            "restaurant_id": rest["_id"],
-            "restaurant_name": rest["name"],
-            "note": note,
-            "added_at": datetime.datetime.utcnow(),
-        }
-    )
+    wishlists.add(rest["_id"], rest["name"], note)
     return {
         "status": "wishlist",
         "msg": f"✅ {rest['name']} has been added to your wishlist."
@@ -273,22 +433,19 @@ def _wishlist_add(sess, name: str, note: str, parsed, user_input):
 
 
 def _wishlist_delete(name: str) -> str:
-    rest = coll.find_one({"name": {"$regex": name, "$options": "i"}})
+    rest = _find_restaurant(name)
     if not rest:
         return f"⚠️ Cannot find restaurant named {name} from wishlist."
-    res = wishlist_coll.delete_one({"restaurant_id": rest["_id"]})
-    return "✅ Removed." if res.deleted_count else "⚠️ Not found in wishlist."
+    removed = get_storage().wishlists.remove(rest["_id"])
+    return "✅ Removed." if removed else "⚠️ Not found in wishlist."
 
 
 def _wishlist_update_note(name: str, note: str) -> str:
-    rest = coll.find_one({"name": {"$regex": name, "$options": "i"}})
+    rest = _find_restaurant(name)
     if not rest:
         return f"⚠️ Cannot find restaurant named {name}."
-    upd = wishlist_coll.update_one(
-        {"restaurant_id": rest["_id"]},
-        {"$set": {"note": note, "updated_at": datetime.datetime.utcnow()}},
-    )
-    return "✅ Note updated." if upd.modified_count else "⚠️ No existing item to update."
+    updated = get_storage().wishlists.set_note(rest["_id"], note)
+    return "✅ Note updated." if updated else "⚠️ No existing item to update."
 
 # -- separate API endpoints for wishlist panel actions --------------------
 
@@ -299,16 +456,13 @@ def wishlist_html():
 
 @app.post("/wishlist/confirm/{rid}")
 def wishlist_confirm(rid: str):
-    try:
-        obj = ObjectId(rid)
-    except Exception:
+    store = get_storage()
+    if not store.restaurants.valid_id(rid):
         return {"msg": "Invalid restaurant ID."}
-    rest = coll.find_one({"_id": obj})
+    rest = store.restaurants.get(rid)
     if not rest:
         return {"msg": "Restaurant not found."}
-    if wishlist_coll.find_one({"restaurant_id": obj}):
+    if store.wishlists.find(rest["_id"]):
         return {"msg": f"{rest['name']} is already in your wishlist."}
-    wishlist_coll.insert_one(
-        {"restaurant_id": obj, "restaurant_name": rest["name"], "added_at": datetime.datetime.utcnow()}
-    )
+    store.wishlists.add(rest["_id"], rest["name"])
     return {"msg": f"{rest['name']} added to wishlist."}
\ No newline at end of file
@@ -6,12 +6,9 @@ from __future__ import annotations
 import json
 import re
 
-from openai import OpenAI
-
-from .cache_utils import load_from_cache, save_to_cache
-from .config import OPENAI_API_KEY
-
-client = OpenAI(api_key=OPENAI_API_KEY)
+from . import llm
+from .cache_utils import load_from_cache, load_many_from_cache, save_to_cache
+from .config import BATCH_LLM_CHUNK
 
 # ───────────────────────── intent classification ──────────────────────────
 
@@ -30,8 +27,21 @@ def _regex_intent(text: str) -> str | None:
         return "smalltalk"
     return None
 
-def classify_query_type(text: str) -> str:
-    """Return the high‑level intent for *text* (uses cache → regex → GPT)."""
+def normalize_query(text: str) -> str:
+    """Case/whitespace‑folded text; keeps digits, ``$`` and punctuation."""
+    return " ".join(text.lower().split())
+
+
+def _debounce_key(session_id: str | None, purpose: str, text: str):
+    """Scheduler key so a session's rapid repeats share one LLM call."""
+    return (session_id, purpose, normalize_query(text)) if session_id else None
+
+
+def classify_query_type(text: str, session_id: str | None = None) -> str:
+    """Return the high‑level intent for *text* (uses cache → regex → GPT).
+
+    If the LLM is overloaded the query is treated as a search (not cached).
+    """
     cached = load_from_cache(text)
     if cached:
         return cached["intent"]
@@ -64,12 +74,18 @@ def classify_query_type(text: str) -> str:
         f"User: \"{text}\""
     )
 
-    resp = client.chat.completions.create(
-        model="gpt-3.5-turbo-1106",
-        messages=[{"role": "user", "content": prompt}],
-        response_format={"type": "json_object"},
-        temperature=0,
-    )
+    try:
+        resp = llm.chat(
+            llm.INTERACTIVE,
+            key=_debounce_key(session_id, "classify", text),
+            model="gpt-3.5-turbo-1106",
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            temperature=0,
+        )
+    except llm.LLMOverloaded as e:
+        print("Classify shed:", e)
+        return "search"
 
     obj = json.loads(resp.choices[0].message.content)
     canonical = obj["canonical"]
@@ -79,6 +95,127 @@ def classify_query_type(text: str) -> str:
     save_to_cache(text, canonical, analysis, intent)
     return intent
 
+# ───────────────────────── batched LLM helpers ───────────────────────────
+
+def _chunks(items: list, size: int):
+    size = max(1, size)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _record_usage(stats: dict | None, resp) -> None:
+    """Accumulate call / token counts from an OpenAI response into *stats*."""
+    if stats is None:
+        return
+    stats["llm_calls"] = stats.get("llm_calls", 0) + 1
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        stats["prompt_tokens"] = stats.get("prompt_tokens", 0) + (usage.prompt_tokens or 0)
+        stats["completion_tokens"] = stats.get("completion_tokens", 0) + (usage.completion_tokens or 0)
+
+
+def _numbered(texts: list[str]) -> str:
+    return "\n".join(f"{i}. {json.dumps(t, ensure_ascii=False)}" for i, t in enumerate(texts))
+
+
+def _batch_completion(system: str, texts: list[str], stats: dict | None) -> dict[int, dict]:
+    """Send one multi-item prompt; return ``{index: item}`` for parsed items."""
+    resp = llm.chat(
+        llm.BATCH,
+        model="gpt-3.5-turbo-1106",
+        messages=[
+            {"role": "system", "content": system},
+            {"role": "user", "content": _numbered(texts)},
+        ],
+        response_format={"type": "json_object"},
+        temperature=0,
+    )
+    _record_usage(stats, resp)
+    items = json.loads(resp.choices[0].message.content).get("items", [])
+    out: dict[int, dict] = {}
+    for it in items:
+        if isinstance(it, dict) and isinstance(it.get("id"), int) and 0 <= it["id"] < len(texts):
+            out[it["id"]] = it
+    return out
+
+
+def _complete_chunk(
+    system: str, chunk: list[str], stats: dict | None, what: str, field: str | None = None
+) -> dict[str, dict]:
+    """Answer *chunk* with BATCH prompts; return ``{text: item}``.
+
+    Items a reply leaves out (or answers without *field*) are retried in
+    halved chunks.  A failed call – shed, API error or bad JSON – is not
+    retried: its items are simply missing from the result.
+    """
+    try:
+        answered = _batch_completion(system, chunk, stats)
+    except llm.LLMOverloaded as e:
+        print(f"Batch {what} shed:", e)
+        return {}
+    except Exception as e:
+        print(f"Batch {what} failed:", e)
+        return {}
+
+    out: dict[str, dict] = {}
+    retry: list[str] = []
+    for i, t in enumerate(chunk):
+        item = answered.get(i)
+        if item is not None and (field is None or item.get(field)):
+            out[t] = item
+        else:
+            retry.append(t)
+    if retry and len(chunk) > 1:
+        for part in _chunks(retry, len(chunk) // 2):
+            out.update(_complete_chunk(system, part, stats, what, field))
+    return out
+
+
+BATCH_INTENT_PROMPT = """
+You are an intent classifier. You will receive a numbered list of user inputs.
+For EACH input, rewrite it into a clean, standardized command and classify it.
+
+Intent options: wishlist_add, wishlist_delete, wishlist_update, wishlist_view,
+search, chat_history, smalltalk, clarification.
+DO NOT invent your own intent labels. If ambiguous, use 'clarification'.
+
+Output ONLY valid JSON in this format:
+{ "items": [ { "id": int, "canonical": string, "intent": string, "analysis": string } ] }
+with exactly one item per input, using the input's number as "id".
+"""
+
+
+def classify_query_types_batch(
+    texts: list[str], chunk_size: int = BATCH_LLM_CHUNK, stats: dict | None = None
+) -> dict[str, str]:
+    """Batch :func:`classify_query_type`: cache → regex → chunked GPT prompts.
+
+    Returns ``{text: intent}``.  Items a chunked reply leaves out are retried
+    in smaller chunks at batch priority; items whose call fails or is shed
+    are left out of the result.
+    """
+    intents: dict[str, str] = {}
+    for t, doc in load_many_from_cache(texts).items():
+        intents[t] = doc["intent"]
+
+    pending: list[str] = []
+    for t in texts:
+        if t in intents:
+            continue
+        intent = _regex_intent(t)
+        if intent:
+            save_to_cache(t, t, "matched_by_regex", intent)
+            intents[t] = intent
+        elif t not in pending:
+            pending.append(t)
+
+    for chunk in _chunks(pending, chunk_size):
+        answered = _complete_chunk(BATCH_INTENT_PROMPT, chunk, stats, "classify", "intent")
+        for t, obj in answered.items():
+            save_to_cache(t, obj.get("canonical", t), obj.get("analysis", ""), obj["intent"])
+            intents[t] = obj["intent"]
+    return intents
+
 # ─────────────────────────── name extraction ─────────────────────────────
 
 def extract_name_from_canonical(canonical: str) -> str:
@@ -116,7 +253,12 @@ If the user says vague things like \"near me\" or \"current location\", default
 Respond ONLY with a valid JSON object. No explanations.
 """
 
-def parse_nl_query(text: str) -> dict:
+def _template_followup(missing: list[str]) -> str:
+    fields = {"location": "which city", "categories": "what kind of food"}
+    return "Could you tell me " + " and ".join(fields[m] for m in missing) + " you're looking for?"
+
+
+def parse_nl_query(text: str, session_id: str | None = None) -> dict:
     """Parse *text* into structured search fields using GPT."""
     messages = [
         {"role": "system", "content": SYSTEM_PROMPT},
@@ -124,7 +266,9 @@ def parse_nl_query(text: str) -> dict:
     ]
 
     try:
-        resp = client.chat.completions.create(
+        resp = llm.chat(
+            llm.INTERACTIVE,
+            key=_debounce_key(session_id, "parse", text),
             model="gpt-3.5-turbo-1106",
             messages=messages,
             response_format={"type": "json_object"},
@@ -147,16 +291,21 @@ def parse_nl_query(text: str) -> dict:
                 "Please generate a friendly English follow‑up question to ask for the missing information. "
                 "Output only the question."
             )
-            followup_resp = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a friendly restaurant assistant."},
-                    {"role": "user", "content": followup_prompt},
-                ],
-                temperature=0.7,
-                max_tokens=100,
-            )
-            followup = followup_resp.choices[0].message.content.strip()
+            try:
+                followup_resp = llm.chat(
+                    llm.FOLLOWUP,
+                    key=_debounce_key(session_id, "followup", text),
+                    model="gpt-3.5-turbo",
+                    messages=[
+                        {"role": "system", "content": "You are a friendly restaurant assistant."},
+                        {"role": "user", "content": followup_prompt},
+                    ],
+                    temperature=0.7,
+                    max_tokens=100,
+                )
+                followup = followup_resp.choices[0].message.content.strip()
+            except llm.LLMOverloaded:
+                followup = _template_followup(missing)
 
         return {
             "parsed": parsed,
@@ -165,6 +314,16 @@ def parse_nl_query(text: str) -> dict:
             "original": text,
         }
 
+    except llm.LLMOverloaded as e:
+        # Shed: no fields; /search still inherits context from the session.
+        print("Parse shed:", e)
+        return {
+            "parsed": {},
+            "missing": ["location", "categories"],
+            "followup": "I'm a little busy right now. " + _template_followup(["location", "categories"]),
+            "original": text,
+        }
+
     except Exception as e:
         print("Parse failed:", e)
         return {
@@ -172,4 +331,38 @@ def parse_nl_query(text: str) -> dict:
             "missing": ["location", "categories"],
             "followup": "Sorry, I couldn’t understand. Could you tell me which city and cuisine you're looking for?",
             "original": text,
-        }
\ No newline at end of file
+        }
+
+
+BATCH_PARSE_PROMPT = """
+You are a helpful restaurant search assistant. You will receive a numbered list
+of natural language queries. For EACH query extract:
+- location (city)
+- categories (e.g., pizza, sushi) [optional]
+- rating (minimum rating, e.g., 4) [optional]
+- price (e.g., $, $$, $$$) [optional]
+
+If a query says vague things like \"near me\" or \"current location\", use \"Los Angeles\".
+
+Respond ONLY with valid JSON in this format:
+{ "items": [ { "id": int, "location": ..., "categories": ..., "rating": ..., "price": ... } ] }
+with exactly one item per query, using the query's number as "id".
+"""
+
+
+def parse_nl_queries_batch(
+    texts: list[str], chunk_size: int = BATCH_LLM_CHUNK, stats: dict | None = None
+) -> dict[str, dict]:
+    """Batch :func:`parse_nl_query` for offline jobs.
+
+    Returns ``{text: {"parsed", "missing", "original"}}``.  No follow‑up
+    questions are generated – callers report ``missing`` instead.  Queries
+    whose call fails or is shed are left out of the result.
+    """
+    out: dict[str, dict] = {}
+    for chunk in _chunks(list(dict.fromkeys(texts)), chunk_size):
+        for t, item in _complete_chunk(BATCH_PARSE_PROMPT, chunk, stats, "parse").items():
+            parsed = {k: v for k, v in item.items() if k != "id" and v not in (None, "")}
+            missing = [k for k in ("location", "categories") if not parsed.get(k)]
+            out[t] = {"parsed": parsed, "missing": missing, "original": t}
+    return out
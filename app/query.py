@@ -0,0 +1,117 @@
+"""Parsed search fields → indexed Mongo query for the ``restaurants`` cache.
+
+The filter/sort shape built here is served by the compound index created in
+``db.py``::
+
+    (location, categories, rating desc, review_count desc, price)
+
+equality on location/categories, then the top‑k sort keys (the minimum
+rating becomes a bound on the ``rating`` key) and price checked on the
+index key before any document is fetched.
+"""
+
+from __future__ import annotations
+
+import re
+
+TOP_K_SORT = [("rating", -1), ("review_count", -1)]
+
+# Compound index serving build_restaurant_query + TOP_K_SORT (created in db.py).
+SEARCH_TOPK_INDEX_NAME = "search_topk"
+SEARCH_TOPK_INDEX = [
+    ("location", 1),
+    ("categories", 1),
+    ("rating", -1),
+    ("review_count", -1),
+    ("price", 1),
+]
+
+
+def min_rating(value) -> float | None:
+    """``4`` / ``"4.5"`` / ``"4+ stars"`` → float, anything else → ``None``."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    m = re.search(r"\d+(?:\.\d+)?", str(value or ""))
+    return float(m.group()) if m else None
+
+
+def price_tiers(value) -> list[str]:
+    """Normalise a price field into a set of Yelp tiers.
+
+    ``"$$"`` → ``["$$"]``; ``"$-$$$"`` → ``["$", "$$", "$$$"]``;
+    ``"$, $$"`` or ``["$", "$$"]`` → ``["$", "$$"]``; ``2`` → ``["$$"]``.
+    """
+    if not value:
+        return []
+    if isinstance(value, int) and not isinstance(value, bool):
+        return ["$" * value] if 1 <= value <= 4 else []
+    if isinstance(value, (list, tuple, set)):
+        return sorted({t for v in value for t in price_tiers(v)}, key=len)
+    s = str(value).replace(" ", "")
+    rng = re.fullmatch(r"(\$+)(?:-|to)(\$+)", s)
+    if rng:
+        lo, hi = sorted((len(rng.group(1)), len(rng.group(2))))
+        return ["$" * n for n in range(lo, min(hi, 4) + 1)]
+    return sorted({t for t in re.findall(r"\$+", s) if len(t) <= 4}, key=len)
+
+
+def pair_filter(location, categories) -> dict:
+    """Mongo filter for a (location, categories) pair: any listed category matches."""
+    cats = {"$in": list(categories)} if isinstance(categories, (list, tuple)) else categories
+    return {"location": location, "categories": cats}
+
+
+def build_restaurant_query(parsed: dict) -> dict:
+    """Return the Mongo filter for *parsed* (location, categories, rating, price)."""
+    query = pair_filter(parsed.get("location"), parsed.get("categories"))
+
+    rating = min_rating(parsed.get("rating"))
+    if rating is not None:
+        query["rating"] = {"$gte": rating}
+
+    tiers = price_tiers(parsed.get("price"))
+    if tiers:
+        query["price"] = {"$in": tiers}
+    return query
+
+
+def filter_results(results: list[dict], parsed: dict, k: int = 5) -> list[dict]:
+    """Apply the same rating / price filters and top‑k order to non‑cache results
+    (e.g. a Yelp fallback, which can't filter on rating itself)."""
+    rating = min_rating(parsed.get("rating"))
+    tiers = set(price_tiers(parsed.get("price")))
+    kept = [
+        r for r in results
+        if (rating is None or (r.get("rating") or 0) >= rating)
+        and (not tiers or r.get("price") in tiers)
+    ]
+    kept.sort(key=lambda r: (r.get("rating") or 0, r.get("review_count") or 0), reverse=True)
+    return kept[:k]
+
+
+def yelp_limit(parsed: dict, k: int = 5) -> int:
+    """Over‑fetch from Yelp when a rating floor will be applied locally."""
+    return 20 if min_rating(parsed.get("rating")) is not None else k
+
+
+def find_top_k(coll, parsed: dict, k: int = 5):
+    """Cursor over the *k* best cached restaurants matching *parsed*."""
+    return coll.find(build_restaurant_query(parsed)).sort(TOP_K_SORT).limit(k)
+
+
+def explain_top_k(coll, parsed: dict, k: int = 5) -> dict:
+    """Summarise the winning plan: index used, in‑memory sort, docs examined."""
+    plan = find_top_k(coll, parsed, k).explain()
+    stages, index = [], None
+    node = plan["queryPlanner"]["winningPlan"]
+    while node:
+        stages.append(node.get("stage"))
+        if node.get("stage") == "IXSCAN":
+            index = node.get("indexName")
+        node = node.get("inputStage") or (node.get("inputStages") or [None])[0]
+    return {
+        "stages": stages,
+        "index": index,
+        "blocking_sort": "SORT" in stages,
+        "docs_examined": plan.get("executionStats", {}).get("totalDocsExamined"),
+    }
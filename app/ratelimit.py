@@ -0,0 +1,36 @@
+"""Thread‑safe token bucket shared by the Yelp warmer and the LLM scheduler."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+
+class TokenBucket:
+    """*rate_per_min* tokens per minute, burst of the same size."""
+
+    def __init__(self, rate_per_min: int):
+        self.capacity = max(1, rate_per_min)
+        self.tokens = float(self.capacity)
+        self.rate = self.capacity / 60.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        with self.lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        with self.lock:
+            self._refill()
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
@@ -0,0 +1,122 @@
+"""Priority admission control for slow, rate‑limited outbound calls.
+
+:class:`LLMScheduler` runs callables under a concurrency cap and a token
+bucket, ordered by priority class, with per‑key coalescing and load
+shedding.  It knows nothing about OpenAI – ``app/llm.py`` wires it to the
+chat client.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Optional
+
+from .ratelimit import TokenBucket
+
+# Priority classes (lower runs first).
+INTERACTIVE, FOLLOWUP, SUMMARY, BATCH = 0, 1, 2, 3
+
+
+class LLMOverloaded(Exception):
+    """The call was shed: it could not start before its queue deadline."""
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int, rate_per_min: int, debounce_s: float,
+                 deadlines: Dict[int, float]):
+        self.max_concurrency = max(1, max_concurrency)
+        self.debounce_s = debounce_s
+        self.deadlines = deadlines                # queue deadline (s) per priority class
+        self._bucket = TokenBucket(rate_per_min)
+        self._cv = threading.Condition()
+        self._queue: list[list] = []             # heap of [priority, seq]
+        self._seq = itertools.count()
+        self._active = 0
+        self._latency = 1.0                      # EWMA of call duration (s)
+        self._inflight: dict[Hashable, Future] = {}
+        self._recent: dict[Hashable, tuple[float, object]] = {}
+
+    # ── admission ────────────────────────────────────────────────────────
+    def _estimated_wait(self, priority: int) -> float:
+        """Rough queueing delay for a new call of *priority* (lock held)."""
+        ahead = sum(1 for p, _ in self._queue if p <= priority)
+        backlog = max(0, ahead + self._active - self.max_concurrency + 1)
+        return backlog / self.max_concurrency * self._latency + self._bucket.wait_time()
+
+    def _admit(self, priority: int, deadline: float) -> None:
+        end = time.monotonic() + deadline
+        with self._cv:
+            if self._estimated_wait(priority) > deadline:
+                raise LLMOverloaded(f"estimated wait exceeds {deadline:.1f}s")
+            ticket = [priority, next(self._seq)]
+            heapq.heappush(self._queue, ticket)
+            while True:
+                timeout = end - time.monotonic()
+                if self._queue[0] is ticket and self._active < self.max_concurrency:
+                    if self._bucket.try_acquire():
+                        break
+                    token_wait = max(self._bucket.wait_time(), 0.001)
+                    timeout = token_wait if token_wait <= timeout else -1
+                if timeout <= 0:
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cv.notify_all()
+                    raise LLMOverloaded(f"not started within {deadline:.1f}s")
+                self._cv.wait(timeout)
+            heapq.heappop(self._queue)
+            self._active += 1
+            self._cv.notify_all()
+
+    def _release(self, elapsed: float) -> None:
+        with self._cv:
+            self._active -= 1
+            self._latency = 0.8 * self._latency + 0.2 * elapsed
+            self._cv.notify_all()
+
+    def _run(self, fn: Callable, priority: int, deadline: float):
+        self._admit(priority, deadline)
+        t0 = time.monotonic()
+        try:
+            return fn()
+        finally:
+            self._release(time.monotonic() - t0)
+
+    # ── public ───────────────────────────────────────────────────────────
+    def submit(self, fn: Callable, priority: int = INTERACTIVE,
+               deadline: Optional[float] = None, key: Optional[Hashable] = None):
+        """Run *fn* under admission control and return its result.
+
+        Raises :class:`LLMOverloaded` if it cannot start within *deadline*.
+        """
+        deadline = self.deadlines[priority] if deadline is None else deadline
+        if key is None:
+            return self._run(fn, priority, deadline)
+
+        with self._cv:
+            now = time.monotonic()
+            self._recent = {k: v for k, v in self._recent.items() if now - v[0] < self.debounce_s}
+            if key in self._recent:
+                return self._recent[key][1]
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+        if not owner:
+            return fut.result()
+
+        try:
+            result = self._run(fn, priority, deadline)
+        except BaseException as e:
+            with self._cv:
+                self._inflight.pop(key, None)
+            fut.set_exception(e)
+            raise
+        with self._cv:
+            self._inflight.pop(key, None)
+            self._recent[key] = (time.monotonic(), result)
+        fut.set_result(result)
+        return result
@@ -0,0 +1,50 @@
+"""Storage backends behind one repository interface (see ``base.py``).
+
+``get_storage()`` returns the process‑wide backend chosen by
+``STORAGE_BACKEND``; tests and benchmarks can swap it with
+``set_storage(SqliteStorage(":memory:"))``.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+from .base import ConversationRepo, IntentCacheRepo, RestaurantRepo, Storage, WishlistRepo
+
+_storage: Optional[Storage] = None
+_lock = threading.Lock()
+
+
+def get_storage() -> Storage:
+    global _storage
+    with _lock:
+        if _storage is None:
+            from ..config import SQLITE_PATH, STORAGE_BACKEND
+
+            if STORAGE_BACKEND == "sqlite":
+                from .sqlite import SqliteStorage
+                _storage = SqliteStorage(SQLITE_PATH)
+            elif STORAGE_BACKEND == "mongo":
+                from .mongo import MongoStorage
+                _storage = MongoStorage()
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND!r}")
+        return _storage
+
+
+def set_storage(storage: Optional[Storage]) -> None:
+    """Install *storage* as the process‑wide backend (``None`` resets it)."""
+    global _storage
+    _storage = storage
+
+
+__all__ = [
+    "ConversationRepo",
+    "IntentCacheRepo",
+    "RestaurantRepo",
+    "Storage",
+    "WishlistRepo",
+    "get_storage",
+    "set_storage",
+]
@@ -0,0 +1,129 @@
+"""Repository interfaces shared by every storage backend.
+
+Ids cross this boundary as strings; timestamps (``fetched_at``,
+``timestamp``, ``added_at``) as naive UTC ``datetime`` objects.  Documents
+are plain dicts shaped like the Mongo documents the app always used.
+"""
+
+from __future__ import annotations
+
+import datetime
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional
+
+
+class RestaurantRepo(ABC):
+    @abstractmethod
+    def top_k(self, parsed: dict, k: int = 5) -> List[dict]:
+        """Best *k* restaurants for parsed search fields (see ``query.py``)."""
+
+    @abstractmethod
+    def valid_id(self, rid: str) -> bool:
+        """True if *rid* is well‑formed for this backend (it may still not exist)."""
+
+    @abstractmethod
+    def get(self, rid: str) -> Optional[dict]:
+        """Restaurant by id; ``None`` if missing or *rid* is malformed."""
+
+    @abstractmethod
+    def find_by_name(self, name: str, limit: int = 5) -> List[dict]:
+        """Case‑insensitive substring match on ``name``."""
+
+    @abstractmethod
+    def upsert(self, doc: dict, overwrite: bool = True) -> Optional[dict]:
+        """Insert or update by ``yelp_id`` and return the stored doc.
+
+        With ``overwrite=False`` an existing document is left untouched.
+        """
+
+    @abstractmethod
+    def has_fresh(self, location, categories, since: datetime.datetime) -> bool:
+        """True if the pair has a doc fetched at or after *since*."""
+
+    @abstractmethod
+    def touch(self, location, categories, fetched_at: datetime.datetime) -> None:
+        """Set ``fetched_at`` on every doc of the (location, categories) pair."""
+
+
+class WishlistRepo(ABC):
+    """``user_id=None`` means "any user" for reads and "no user" for writes."""
+
+    @abstractmethod
+    def items(self, user_id: Optional[str] = None) -> List[dict]:
+        """Wishlist entries, newest first."""
+
+    @abstractmethod
+    def find(self, restaurant_id: str, user_id: Optional[str] = None) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def add(self, restaurant_id: str, restaurant_name: str, note: str = "",
+            user_id: Optional[str] = None) -> None:
+        ...
+
+    @abstractmethod
+    def remove(self, restaurant_id: str, user_id: Optional[str] = None) -> bool:
+        ...
+
+    @abstractmethod
+    def set_note(self, restaurant_id: str, note: str, user_id: Optional[str] = None) -> bool:
+        """Update the note; ``False`` if no such entry."""
+
+
+class ConversationRepo(ABC):
+    @abstractmethod
+    def insert(self, doc: dict) -> None:
+        ...
+
+    @abstractmethod
+    def last_with_location(self, session_id: str) -> Optional[dict]:
+        """Latest turn of the session whose ``parsed`` has a ``location`` key."""
+
+    @abstractmethod
+    def page(self, session_id: str, before: Optional[tuple] = None, limit: int = 10) -> List[dict]:
+        """Turns newest first, strictly older than the ``(timestamp, id)`` keyset *before*."""
+
+    @abstractmethod
+    def demand(self, since: datetime.datetime, limit: int) -> List[dict]:
+        """Top (location, categories) search pairs since *since*:
+        ``[{"location", "categories", "hits", "misses"}]`` ranked by misses,
+        hits, recency."""
+
+    @abstractmethod
+    def migrate_timestamps(self) -> int:
+        """Convert legacy string timestamps to native dates; return count."""
+
+    @abstractmethod
+    def oldest_before(self, cutoff: datetime.datetime, limit: int) -> List[dict]:
+        """Oldest turns before *cutoff* (session_id, timestamp, intent, user_input)."""
+
+    @abstractmethod
+    def merge_rollups(self, rollups: Dict[str, dict], keep_inputs: int) -> None:
+        """Fold ``{session_id: {turns, first, last, intents, inputs}}`` into rollups."""
+
+    @abstractmethod
+    def delete(self, ids: Iterable[str]) -> None:
+        ...
+
+
+class IntentCacheRepo(ABC):
+    @abstractmethod
+    def load(self, text: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def load_many(self, texts: Iterable[str]) -> Dict[str, dict]:
+        """``{text: entry}`` for every *text* with an entry."""
+
+    @abstractmethod
+    def save(self, raw_text: str, canonical: str, analysis: str, intent: str) -> None:
+        ...
+
+
+class Storage:
+    """Bundle of the four repositories a backend provides."""
+
+    restaurants: RestaurantRepo
+    wishlists: WishlistRepo
+    conversations: ConversationRepo
+    intent_cache: IntentCacheRepo
@@ -0,0 +1,63 @@
+"""JSONL‑file intent cache (the original ``intent_cache.jsonl`` format)."""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import time
+from typing import Dict, Iterable, Optional
+
+from ..cache_utils import _key
+from .base import IntentCacheRepo
+
+# JSONL file lives at repo‑root/intent_cache.jsonl, easy to inspect.
+CACHE_FILE = pathlib.Path(__file__).resolve().parents[2] / "intent_cache.jsonl"
+
+
+class JsonlIntentCache(IntentCacheRepo):
+    def __init__(self, path: pathlib.Path = CACHE_FILE):
+        self.path = pathlib.Path(path)
+        self.path.touch(exist_ok=True)
+
+    def _iter(self):
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def load(self, text: str) -> Optional[Dict]:
+        # hits / last_used are bumped in‑memory only (not flushed back to disk)
+        k = _key(text)
+        for doc in self._iter():
+            if doc["key"] == k:
+                doc["hits"] += 1
+                doc["last_used"] = time.time()
+                return doc
+        return None
+
+    def load_many(self, texts: Iterable[str]) -> Dict[str, Dict]:
+        wanted: Dict[str, list] = {}
+        for t in texts:
+            wanted.setdefault(_key(t), []).append(t)
+        found: Dict[str, Dict] = {}
+        for doc in self._iter():
+            for t in wanted.pop(doc["key"], []):
+                doc["hits"] += 1
+                doc["last_used"] = time.time()
+                found[t] = doc
+            if not wanted:
+                break
+        return found
+
+    def save(self, raw_text: str, canonical: str, analysis: str, intent: str) -> None:
+        doc = {
+            "key": _key(raw_text),
+            "canonical": canonical,
+            "analysis": analysis,
+            "intent": intent,
+            "hits": 1,
+            "last_used": time.time(),
+        }
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
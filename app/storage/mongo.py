@@ -0,0 +1,216 @@
+"""MongoDB backend – the collections defined in ``app/db.py``."""
+
+from __future__ import annotations
+
+import datetime
+import re
+from typing import Dict, Iterable, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+
+from ..query import find_top_k, pair_filter
+from .base import ConversationRepo, RestaurantRepo, Storage, WishlistRepo
+from .intent_file import JsonlIntentCache
+
+
+def _oid(value) -> Optional[ObjectId]:
+    try:
+        return value if isinstance(value, ObjectId) else ObjectId(value)
+    except (InvalidId, TypeError):
+        return None
+
+
+def _out(doc: Optional[dict], *id_fields: str) -> Optional[dict]:
+    """Stringify ``_id`` (and other ObjectId fields) on the way out."""
+    if doc is None:
+        return None
+    for f in ("_id",) + id_fields:
+        if isinstance(doc.get(f), ObjectId):
+            doc[f] = str(doc[f])
+    return doc
+
+
+class MongoRestaurants(RestaurantRepo):
+    def __init__(self, coll):
+        self.coll = coll
+
+    def top_k(self, parsed, k=5):
+        return [_out(d) for d in find_top_k(self.coll, parsed, k)]
+
+    def valid_id(self, rid):
+        return isinstance(rid, ObjectId) or ObjectId.is_valid(rid)
+
+    def get(self, rid):
+        oid = _oid(rid)
+        return _out(self.coll.find_one({"_id": oid})) if oid else None
+
+    def find_by_name(self, name, limit=5):
+        regex = {"$regex": re.escape(name), "$options": "i"}
+        return [_out(d) for d in self.coll.find({"name": regex}).limit(limit)]
+
+    def upsert(self, doc, overwrite=True):
+        op = "$set" if overwrite else "$setOnInsert"
+        self.coll.update_one({"yelp_id": doc["yelp_id"]}, {op: doc}, upsert=True)
+        return _out(self.coll.find_one({"yelp_id": doc["yelp_id"]}))
+
+    def has_fresh(self, location, categories, since):
+        query = {**pair_filter(location, categories), "fetched_at": {"$gte": since}}
+        return self.coll.find_one(query) is not None
+
+    def touch(self, location, categories, fetched_at):
+        self.coll.update_many(pair_filter(location, categories), {"$set": {"fetched_at": fetched_at}})
+
+
+class MongoWishlists(WishlistRepo):
+    def __init__(self, coll):
+        self.coll = coll
+
+    @staticmethod
+    def _query(restaurant_id=None, user_id=None) -> dict:
+        q: dict = {}
+        if restaurant_id is not None:
+            q["restaurant_id"] = _oid(restaurant_id)
+        if user_id is not None:
+            q["user_id"] = user_id
+        return q
+
+    def items(self, user_id=None):
+        cur = self.coll.find(self._query(user_id=user_id)).sort("added_at", -1)
+        return [_out(d, "restaurant_id") for d in cur]
+
+    def find(self, restaurant_id, user_id=None):
+        return _out(self.coll.find_one(self._query(restaurant_id, user_id)), "restaurant_id")
+
+    def add(self, restaurant_id, restaurant_name, note="", user_id=None):
+        doc = {
+            "restaurant_id": _oid(restaurant_id),
+            "restaurant_name": restaurant_name,
+            "note": note,
+            "added_at": datetime.datetime.utcnow(),
+        }
+        if user_id is not None:
+            doc["user_id"] = user_id
+        self.coll.insert_one(doc)
+
+    def remove(self, restaurant_id, user_id=None):
+        return bool(self.coll.delete_one(self._query(restaurant_id, user_id)).deleted_count)
+
+    def set_note(self, restaurant_id, note, user_id=None):
+        res = self.coll.update_one(
+            self._query(restaurant_id, user_id),
+            {"$set": {"note": note, "updated_at": datetime.datetime.utcnow()}},
+        )
+        return bool(res.matched_count)
+
+
+class MongoConversations(ConversationRepo):
+    _PAGE_FIELDS = {"user_input": 1, "response": 1, "intent": 1, "timestamp": 1}
+
+    def __init__(self, coll, rollups):
+        self.coll = coll
+        self.rollups = rollups
+
+    def insert(self, doc):
+        self.coll.insert_one(dict(doc))
+
+    def last_with_location(self, session_id):
+        return _out(self.coll.find_one(
+            {"session_id": session_id, "parsed.location": {"$exists": True}},
+            sort=[("timestamp", -1)],
+        ))
+
+    def page(self, session_id, before=None, limit=10):
+        query: dict = {"session_id": session_id}
+        if before:
+            ts, oid = before
+            oid = _oid(oid)
+            if oid is None:
+                raise ValueError("invalid cursor id")
+            query["$or"] = [
+                {"timestamp": {"$lt": ts}},
+                {"timestamp": ts, "_id": {"$lt": oid}},
+            ]
+        cur = (
+            self.coll.find(query, self._PAGE_FIELDS)
+            .sort([("timestamp", -1), ("_id", -1)])
+            .limit(limit)
+        )
+        return [_out(d) for d in cur]
+
+    def demand(self, since, limit):
+        pipeline = [
+            {
+                "$match": {
+                    "intent": "search",
+                    "timestamp": {"$gte": since},
+                    "parsed.location": {"$nin": [None, ""]},
+                    "parsed.categories": {"$nin": [None, ""]},
+                }
+            },
+            {
+                "$group": {
+                    "_id": {"location": "$parsed.location", "categories": "$parsed.categories"},
+                    "hits": {"$sum": 1},
+                    "misses": {"$sum": {"$cond": [{"$eq": ["$source", "yelp"]}, 1, 0]}},
+                    "last": {"$max": "$timestamp"},
+                }
+            },
+            {"$sort": {"misses": -1, "hits": -1, "last": -1}},
+            {"$limit": limit},
+        ]
+        return [
+            {**row["_id"], "hits": row["hits"], "misses": row["misses"]}
+            for row in self.coll.aggregate(pipeline)
+        ]
+
+    def migrate_timestamps(self):
+        res = self.coll.update_many(
+            {"timestamp": {"$type": "string"}},
+            [{"$set": {"timestamp": {"$dateFromString": {"dateString": "$timestamp"}}}}],
+        )
+        return res.modified_count
+
+    def oldest_before(self, cutoff, limit):
+        fields = {"session_id": 1, "timestamp": 1, "intent": 1, "user_input": 1}
+        cur = self.coll.find({"timestamp": {"$lt": cutoff}}, fields).sort("timestamp", 1).limit(limit)
+        return [_out(d) for d in cur]
+
+    def merge_rollups(self, rollups: Dict[str, dict], keep_inputs: int) -> None:
+        ops = []
+        for sid, r in rollups.items():
+            inc = {"turns": r["turns"]}
+            inc.update({f"intents.{k}": v for k, v in r["intents"].items()})
+            ops.append(
+                UpdateOne(
+                    {"session_id": sid},
+                    {
+                        "$inc": inc,
+                        "$min": {"first_ts": r["first"]},
+                        "$max": {"last_ts": r["last"]},
+                        "$push": {
+                            "recent_inputs": {
+                                "$each": r["inputs"][-keep_inputs:],
+                                "$slice": -keep_inputs,
+                            }
+                        },
+                    },
+                    upsert=True,
+                )
+            )
+        if ops:
+            self.rollups.bulk_write(ops, ordered=False)
+
+    def delete(self, ids: Iterable[str]) -> None:
+        self.coll.delete_many({"_id": {"$in": [_oid(i) for i in ids]}})
+
+
+class MongoStorage(Storage):
+    def __init__(self):
+        from .. import db   # connects & creates indexes on first use only
+
+        self.restaurants = MongoRestaurants(db.coll)
+        self.wishlists = MongoWishlists(db.wishlist_coll)
+        self.conversations = MongoConversations(db.conversations_coll, db.rollups_coll)
+        self.intent_cache = JsonlIntentCache()
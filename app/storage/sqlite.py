@@ -0,0 +1,472 @@
+"""Embedded SQLite backend – in‑process, no server required.
+
+Meant for small deployments and the offline test / benchmark suite.  Pass
+``":memory:"`` as *path* for a throw‑away database.  Lookups go through
+the indexes below; documents keep their full Mongo‑shaped dict in a JSON
+``doc`` column, with the fields we filter / sort on promoted to columns.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from ..cache_utils import _key
+from ..query import min_rating, price_tiers
+from .base import ConversationRepo, IntentCacheRepo, RestaurantRepo, Storage, WishlistRepo
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurants (
+    id           INTEGER PRIMARY KEY,
+    yelp_id      TEXT UNIQUE,
+    name         TEXT,
+    location     TEXT,
+    categories   TEXT,              -- JSON, as stored in Mongo (string or list)
+    rating       REAL,
+    review_count INTEGER,
+    price        TEXT,
+    fetched_at   TEXT,
+    doc          TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS restaurant_categories (
+    restaurant_id INTEGER NOT NULL REFERENCES restaurants(id) ON DELETE CASCADE,
+    category      TEXT NOT NULL,
+    PRIMARY KEY (category, restaurant_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_rest_topk
+    ON restaurants (location, rating DESC, review_count DESC, price);
+CREATE INDEX IF NOT EXISTS idx_rest_name ON restaurants (name COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS wishlists (
+    id              INTEGER PRIMARY KEY,
+    user_id         TEXT,
+    restaurant_id   TEXT NOT NULL,
+    restaurant_name TEXT,
+    note            TEXT,
+    added_at        TEXT,
+    updated_at      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_wish_rest ON wishlists (restaurant_id, user_id);
+CREATE INDEX IF NOT EXISTS idx_wish_name ON wishlists (restaurant_name);
+
+CREATE TABLE IF NOT EXISTS conversations (
+    id         INTEGER PRIMARY KEY,
+    session_id TEXT,
+    timestamp  TEXT,
+    user_input TEXT,
+    response   TEXT,                -- JSON
+    intent     TEXT,
+    parsed     TEXT,                -- JSON
+    results    TEXT,                -- JSON
+    source     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_conv_session ON conversations (session_id, timestamp DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_conv_ts ON conversations (timestamp);
+
+CREATE TABLE IF NOT EXISTS conversation_rollups (
+    session_id    TEXT PRIMARY KEY,
+    turns         INTEGER NOT NULL,
+    first_ts      TEXT,
+    last_ts       TEXT,
+    intents       TEXT,             -- JSON {intent: count}
+    recent_inputs TEXT              -- JSON [str]
+);
+
+CREATE TABLE IF NOT EXISTS intent_cache (
+    key       TEXT PRIMARY KEY,
+    canonical TEXT,
+    analysis  TEXT,
+    intent    TEXT,
+    hits      INTEGER,
+    last_used REAL
+);
+"""
+
+
+def _ts(value: Optional[datetime.datetime]) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+
+def _dt(value: Optional[str]) -> Optional[datetime.datetime]:
+    return datetime.datetime.fromisoformat(value) if value else None
+
+
+def _cats(categories) -> list:
+    if categories is None:
+        return []
+    return list(categories) if isinstance(categories, (list, tuple)) else [categories]
+
+
+class _Db:
+    """One shared connection, serialised by a lock (used from worker threads)."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(_SCHEMA)
+
+    def all(self, sql: str, args: Iterable = ()) -> list:
+        with self.lock:
+            return self.conn.execute(sql, tuple(args)).fetchall()
+
+    def one(self, sql: str, args: Iterable = ()):
+        with self.lock:
+            return self.conn.execute(sql, tuple(args)).fetchone()
+
+    def run(self, sql: str, args: Iterable = ()) -> sqlite3.Cursor:
+        with self.lock:
+            return self.conn.execute(sql, tuple(args))
+
+    def tx(self):
+        return _Tx(self)
+
+
+class _Tx:
+    def __init__(self, db: _Db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.lock.acquire()
+        self.db.conn.execute("BEGIN")
+        return self.db.conn
+
+    def __exit__(self, exc_type, *_):
+        try:
+            self.db.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.db.lock.release()
+
+
+# ───────────────────────────── restaurants ───────────────────────────────
+
+class SqliteRestaurants(RestaurantRepo):
+    def __init__(self, db: _Db):
+        self.db = db
+
+    @staticmethod
+    def _row(row) -> Optional[dict]:
+        if row is None:
+            return None
+        doc = json.loads(row["doc"])
+        doc["_id"] = str(row["id"])
+        doc["fetched_at"] = _dt(row["fetched_at"])
+        return doc
+
+    def _pair_sql(self, location, categories) -> tuple[str, list]:
+        cats = _cats(categories)
+        sql = (
+            "location = ? AND id IN (SELECT restaurant_id FROM restaurant_categories"
+            f" WHERE category IN ({','.join('?' * len(cats)) or 'NULL'}))"
+        )
+        return sql, [location, *cats]
+
+    def top_k(self, parsed, k=5):
+        where, args = self._pair_sql(parsed.get("location"), parsed.get("categories"))
+        rating = min_rating(parsed.get("rating"))
+        if rating is not None:
+            where += " AND rating >= ?"
+            args.append(rating)
+        tiers = price_tiers(parsed.get("price"))
+        if tiers:
+            where += f" AND price IN ({','.join('?' * len(tiers))})"
+            args.extend(tiers)
+        rows = self.db.all(
+            f"SELECT * FROM restaurants WHERE {where}"
+            " ORDER BY rating DESC, review_count DESC LIMIT ?",
+            [*args, k],
+        )
+        return [self._row(r) for r in rows]
+
+    def valid_id(self, rid):
+        return isinstance(rid, int) or str(rid).isdigit()
+
+    def get(self, rid):
+        try:
+            rid = int(rid)
+        except (TypeError, ValueError):
+            return None
+        return self._row(self.db.one("SELECT * FROM restaurants WHERE id = ?", [rid]))
+
+    def find_by_name(self, name, limit=5):
+        pattern = "%" + name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self.db.all(
+            "SELECT * FROM restaurants WHERE name LIKE ? ESCAPE '\\' LIMIT ?", [pattern, limit]
+        )
+        return [self._row(r) for r in rows]
+
+    def upsert(self, doc, overwrite=True):
+        body = {k: v for k, v in doc.items() if k not in ("_id", "fetched_at")}
+        cols = (
+            doc["yelp_id"], doc.get("name"), doc.get("location"),
+            json.dumps(doc.get("categories")), doc.get("rating"), doc.get("review_count"),
+            doc.get("price"), _ts(doc.get("fetched_at")),
+        )
+        with self.db.tx() as conn:
+            row = conn.execute("SELECT id, doc FROM restaurants WHERE yelp_id = ?", [doc["yelp_id"]]).fetchone()
+            if row and not overwrite:
+                rid = row["id"]
+            elif row:
+                merged = {**json.loads(row["doc"]), **body}
+                conn.execute(
+                    "UPDATE restaurants SET name=?, location=?, categories=?, rating=?,"
+                    " review_count=?, price=?, fetched_at=?, doc=? WHERE id=?",
+                    [*cols[1:], json.dumps(merged), row["id"]],
+                )
+                rid = row["id"]
+            else:
+                rid = conn.execute(
+                    "INSERT INTO restaurants (yelp_id, name, location, categories, rating,"
+                    " review_count, price, fetched_at, doc) VALUES (?,?,?,?,?,?,?,?,?)",
+                    [*cols, json.dumps(body)],
+                ).lastrowid
+            if not row or overwrite:
+                conn.execute("DELETE FROM restaurant_categories WHERE restaurant_id = ?", [rid])
+                conn.executemany(
+                    "INSERT OR IGNORE INTO restaurant_categories VALUES (?, ?)",
+                    [(rid, c) for c in _cats(doc.get("categories"))],
+                )
+        return self.get(rid)
+
+    def has_fresh(self, location, categories, since):
+        where, args = self._pair_sql(location, categories)
+        row = self.db.one(
+            f"SELECT 1 FROM restaurants WHERE {where} AND fetched_at >= ? LIMIT 1",
+            [*args, _ts(since)],
+        )
+        return row is not None
+
+    def touch(self, location, categories, fetched_at):
+        where, args = self._pair_sql(location, categories)
+        self.db.run(f"UPDATE restaurants SET fetched_at = ? WHERE {where}", [_ts(fetched_at), *args])
+
+
+# ───────────────────────────── wishlists ─────────────────────────────────
+
+class SqliteWishlists(WishlistRepo):
+    def __init__(self, db: _Db):
+        self.db = db
+
+    @staticmethod
+    def _row(row) -> Optional[dict]:
+        if row is None:
+            return None
+        doc = {k: row[k] for k in row.keys() if k != "id" and row[k] is not None}
+        doc["_id"] = str(row["id"])
+        for f in ("added_at", "updated_at"):
+            if f in doc:
+                doc[f] = _dt(doc[f])
+        return doc
+
+    @staticmethod
+    def _where(restaurant_id=None, user_id=None) -> tuple[str, list]:
+        clauses, args = ["1=1"], []
+        if restaurant_id is not None:
+            clauses.append("restaurant_id = ?")
+            args.append(str(restaurant_id))
+        if user_id is not None:
+            clauses.append("user_id = ?")
+            args.append(user_id)
+        return " AND ".join(clauses), args
+
+    def items(self, user_id=None):
+        where, args = self._where(user_id=user_id)
+        rows = self.db.all(f"SELECT * FROM wishlists WHERE {where} ORDER BY added_at DESC, id DESC", args)
+        return [self._row(r) for r in rows]
+
+    def find(self, restaurant_id, user_id=None):
+        where, args = self._where(restaurant_id, user_id)
+        return self._row(self.db.one(f"SELECT * FROM wishlists WHERE {where} LIMIT 1", args))
+
+    def add(self, restaurant_id, restaurant_name, note="", user_id=None):
+        self.db.run(
+            "INSERT INTO wishlists (user_id, restaurant_id, restaurant_name, note, added_at)"
+            " VALUES (?,?,?,?,?)",
+            [user_id, str(restaurant_id), restaurant_name, note, _ts(datetime.datetime.utcnow())],
+        )
+
+    def remove(self, restaurant_id, user_id=None):
+        where, args = self._where(restaurant_id, user_id)
+        cur = self.db.run(
+            f"DELETE FROM wishlists WHERE id = (SELECT id FROM wishlists WHERE {where} LIMIT 1)", args
+        )
+        return cur.rowcount > 0
+
+    def set_note(self, restaurant_id, note, user_id=None):
+        where, args = self._where(restaurant_id, user_id)
+        cur = self.db.run(
+            "UPDATE wishlists SET note = ?, updated_at = ?"
+            f" WHERE id = (SELECT id FROM wishlists WHERE {where} LIMIT 1)",
+            [note, _ts(datetime.datetime.utcnow()), *args],
+        )
+        return cur.rowcount > 0
+
+
+# ───────────────────────────── conversations ─────────────────────────────
+
+class SqliteConversations(ConversationRepo):
+    def __init__(self, db: _Db):
+        self.db = db
+
+    @staticmethod
+    def _row(row) -> Optional[dict]:
+        if row is None:
+            return None
+        doc = {"_id": str(row["id"])}
+        for k in row.keys():
+            if k == "id":
+                continue
+            v = row[k]
+            if k in ("response", "parsed", "results") and v is not None:
+                v = json.loads(v)
+            elif k == "timestamp":
+                v = _dt(v)
+            doc[k] = v
+        return doc
+
+    def insert(self, doc):
+        ts = doc.get("timestamp") or datetime.datetime.utcnow()
+        self.db.run(
+            "INSERT INTO conversations (session_id, timestamp, user_input, response, intent,"
+            " parsed, results, source) VALUES (?,?,?,?,?,?,?,?)",
+            [
+                doc.get("session_id"), _ts(ts), doc.get("user_input"),
+                json.dumps(doc.get("response"), ensure_ascii=False), doc.get("intent"),
+                json.dumps(doc.get("parsed"), ensure_ascii=False),
+                json.dumps(doc.get("results"), ensure_ascii=False), doc.get("source"),
+            ],
+        )
+
+    def last_with_location(self, session_id):
+        return self._row(self.db.one(
+            "SELECT * FROM conversations WHERE session_id = ?"
+            " AND json_type(parsed, '$.location') IS NOT NULL"
+            " ORDER BY timestamp DESC, id DESC LIMIT 1",
+            [session_id],
+        ))
+
+    def page(self, session_id, before=None, limit=10):
+        sql = "SELECT id, user_input, response, intent, timestamp FROM conversations WHERE session_id = ?"
+        args: list = [session_id]
+        if before:
+            ts, rid = before
+            sql += " AND (timestamp < ? OR (timestamp = ? AND id < ?))"
+            args += [_ts(ts), _ts(ts), int(rid)]
+        rows = self.db.all(sql + " ORDER BY timestamp DESC, id DESC LIMIT ?", [*args, limit])
+        return [self._row(r) for r in rows]
+
+    def demand(self, since, limit):
+        rows = self.db.all(
+            "SELECT json_extract(parsed, '$.location') AS location,"
+            "       json_extract(parsed, '$.categories') AS categories,"
+            "       json_type(parsed, '$.categories') AS ctype,"
+            "       COUNT(*) AS hits,"
+            "       SUM(source = 'yelp') AS misses,"
+            "       MAX(timestamp) AS last"
+            " FROM conversations"
+            " WHERE intent = 'search' AND timestamp >= ?"
+            "   AND COALESCE(json_extract(parsed, '$.location'), '') != ''"
+            "   AND COALESCE(json_extract(parsed, '$.categories'), '') != ''"
+            " GROUP BY location, categories"
+            " ORDER BY misses DESC, hits DESC, last DESC LIMIT ?",
+            [_ts(since), limit],
+        )
+        return [
+            {
+                "location": r["location"],
+                "categories": json.loads(r["categories"]) if r["ctype"] == "array" else r["categories"],
+                "hits": r["hits"],
+                "misses": r["misses"] or 0,
+            }
+            for r in rows
+        ]
+
+    def migrate_timestamps(self):
+        # timestamps are ISO strings in this backend already
+        return 0
+
+    def oldest_before(self, cutoff, limit):
+        rows = self.db.all(
+            "SELECT id, session_id, timestamp, intent, user_input FROM conversations"
+            " WHERE timestamp < ? ORDER BY timestamp LIMIT ?",
+            [_ts(cutoff), limit],
+        )
+        return [self._row(r) for r in rows]
+
+    def merge_rollups(self, rollups: Dict[str, dict], keep_inputs: int) -> None:
+        with self.db.tx() as conn:
+            for sid, r in rollups.items():
+                row = conn.execute(
+                    "SELECT * FROM conversation_rollups WHERE session_id = ?", [sid]
+                ).fetchone()
+                intents = json.loads(row["intents"]) if row else {}
+                for k, v in r["intents"].items():
+                    intents[k] = intents.get(k, 0) + v
+                inputs = (json.loads(row["recent_inputs"]) if row else []) + r["inputs"]
+                first, last = _ts(r["first"]), _ts(r["last"])
+                if row:
+                    first, last = min(first, row["first_ts"]), max(last, row["last_ts"])
+                conn.execute(
+                    "INSERT OR REPLACE INTO conversation_rollups VALUES (?,?,?,?,?,?)",
+                    [
+                        sid, (row["turns"] if row else 0) + r["turns"], first, last,
+                        json.dumps(intents), json.dumps(inputs[-keep_inputs:], ensure_ascii=False),
+                    ],
+                )
+
+    def delete(self, ids: Iterable[str]) -> None:
+        ids = [int(i) for i in ids]
+        if ids:
+            self.db.run(f"DELETE FROM conversations WHERE id IN ({','.join('?' * len(ids))})", ids)
+
+
+# ───────────────────────────── intent cache ──────────────────────────────
+
+class SqliteIntentCache(IntentCacheRepo):
+    def __init__(self, db: _Db):
+        self.db = db
+
+    def _hit(self, keys: list) -> None:
+        self.db.run(
+            f"UPDATE intent_cache SET hits = hits + 1, last_used = ? WHERE key IN ({','.join('?' * len(keys))})",
+            [time.time(), *keys],
+        )
+
+    def load(self, text):
+        return self.load_many([text]).get(text)
+
+    def load_many(self, texts):
+        texts = list(texts)
+        keys = {t: _key(t) for t in texts}
+        uniq = sorted(set(keys.values()))
+        if not uniq:
+            return {}
+        rows = self.db.all(
+            f"SELECT * FROM intent_cache WHERE key IN ({','.join('?' * len(uniq))})", uniq
+        )
+        if rows:
+            self._hit([r["key"] for r in rows])
+        by_key = {r["key"]: {**dict(r), "hits": r["hits"] + 1} for r in rows}
+        return {t: by_key[k] for t, k in keys.items() if k in by_key}
+
+    def save(self, raw_text, canonical, analysis, intent):
+        self.db.run(
+            "INSERT OR REPLACE INTO intent_cache VALUES (?,?,?,?,?,?)",
+            [_key(raw_text), canonical, analysis, intent, 1, time.time()],
+        )
+
+
+class SqliteStorage(Storage):
+    def __init__(self, path: str = ":memory:"):
+        db = _Db(str(path))
+        self.restaurants = SqliteRestaurants(db)
+        self.wishlists = SqliteWishlists(db)
+        self.conversations = SqliteConversations(db)
+        self.intent_cache = SqliteIntentCache(db)
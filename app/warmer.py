@@ -0,0 +1,180 @@
+"""Restaurant cache freshness: stale‑while‑revalidate + demand‑driven warming.
+
+Every restaurant document carries a ``fetched_at`` timestamp.  Stale entries
+are still served immediately; a background refresh re‑fetches the
+(location, categories) pair from Yelp.  A daemon thread also mines popular
+and recently missed pairs from the conversation log and pre‑fetches them so
+the first user of a pair does not pay the Yelp latency.
+
+All background Yelp traffic draws from one shared token bucket
+(``YELP_RATE_PER_MIN``).
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import (
+    RESTAURANT_TTL_HOURS,
+    WARM_INTERVAL_S,
+    WARM_LOOKBACK_HOURS,
+    WARM_TOP_N,
+    YELP_RATE_PER_MIN,
+)
+from .ratelimit import TokenBucket
+from .storage import get_storage
+from .yelp import search_yelp
+
+_budget = TokenBucket(YELP_RATE_PER_MIN)
+_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="yelp-refresh")
+_inflight: set[tuple] = set()
+_inflight_lock = threading.Lock()
+
+# ───────────────────────────── storage helpers ───────────────────────────
+
+def _pair(parsed: dict) -> tuple:
+    return parsed.get("location"), json.dumps(parsed.get("categories"), sort_keys=True)
+
+
+def upsert_yelp(parsed: dict, yelp: list[dict]) -> list[dict]:
+    """Upsert Yelp businesses into ``restaurants`` and return the cleaned results."""
+    now = datetime.datetime.utcnow()
+    cleaned: list[dict] = []
+    for biz in yelp:
+        doc = {
+            "yelp_id": biz["id"],
+            "name": biz["name"],
+            "categories": parsed.get("categories"),
+            "location": parsed.get("location"),
+            "rating": biz.get("rating"),
+            "review_count": biz.get("review_count", 0),
+            "price": biz.get("price"),
+            "address": ", ".join(biz["location"]["display_address"]),
+            "img": biz.get("image_url", ""),
+            "url": biz.get("url", ""),
+            "lat": biz["coordinates"]["latitude"],
+            "lng": biz["coordinates"]["longitude"],
+            "fetched_at": now,
+        }
+        stored = get_storage().restaurants.upsert(doc)
+        if not stored:
+            continue
+        cleaned.append(
+            {
+                "_id": stored["_id"],
+                "name": doc["name"],
+                "rating": doc.get("rating"),
+                "review_count": doc.get("review_count"),
+                "address": doc.get("address"),
+                "price": doc.get("price"),
+                "img": doc["img"] or "https://via.placeholder.com/400x200?text=No+Image",
+                "url": doc["url"] or "https://www.yelp.com",
+                "lat": doc["lat"],
+                "lng": doc["lng"],
+            }
+        )
+    return cleaned
+
+
+def is_stale(docs: list[dict]) -> bool:
+    """True if any doc is missing ``fetched_at`` or is older than the TTL."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=RESTAURANT_TTL_HOURS)
+    return any(not d.get("fetched_at") or d["fetched_at"] < cutoff for d in docs)
+
+
+def _has_fresh(parsed: dict) -> bool:
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=RESTAURANT_TTL_HOURS)
+    return get_storage().restaurants.has_fresh(parsed.get("location"), parsed.get("categories"), cutoff)
+
+# ───────────────────────────── refresh ───────────────────────────────────
+
+def refresh(parsed: dict) -> bool:
+    """Re‑fetch one (location, categories) pair from Yelp if the budget allows.
+
+    *parsed* should carry only the pair (see :func:`refresh_in_background`).
+    """
+    if not _budget.try_acquire():
+        return False
+    try:
+        biz = search_yelp(parsed)
+    except Exception as e:
+        print("Yelp refresh failed:", parsed, e)
+        return False
+    upsert_yelp(parsed, biz)
+    # The pair as a whole was revalidated; also touch cached entries Yelp no
+    # longer returns so they don't re-trigger a refresh on every request.
+    get_storage().restaurants.touch(
+        parsed.get("location"), parsed.get("categories"), datetime.datetime.utcnow()
+    )
+    return True
+
+
+def _refresh_task(parsed: dict, key: tuple) -> None:
+    try:
+        refresh(parsed)
+    finally:
+        with _inflight_lock:
+            _inflight.discard(key)
+
+
+def refresh_in_background(parsed: dict) -> None:
+    """Schedule a refresh of *parsed*'s pair; no‑op if one is already running.
+
+    Only location and categories are kept: ``touch`` marks the whole pair
+    fresh, so the re‑fetch must not be narrowed by price or rating.
+    """
+    key = _pair(parsed)
+    with _inflight_lock:
+        if key in _inflight:
+            return
+        _inflight.add(key)
+    pair = {"location": parsed.get("location"), "categories": parsed.get("categories")}
+    _pool.submit(_refresh_task, pair, key)
+
+# ───────────────────────────── demand mining ─────────────────────────────
+
+def mine_demand(limit: int = WARM_TOP_N, lookback_hours: int = WARM_LOOKBACK_HOURS) -> list[dict]:
+    """Return the most wanted (location, categories) pairs from the conversation log.
+
+    Pairs are ranked by recent misses (searches answered by Yelp instead of
+    the cache), then by overall popularity and recency.
+    """
+    since = datetime.datetime.utcnow() - datetime.timedelta(hours=lookback_hours)
+    return get_storage().conversations.demand(since, limit)
+
+
+def warm_once(limit: int = WARM_TOP_N) -> dict:
+    """One warming pass; stops early when the rate budget is exhausted."""
+    stats = {"candidates": 0, "fresh": 0, "refreshed": 0, "deferred": 0}
+    for pair in mine_demand(limit):
+        stats["candidates"] += 1
+        parsed = {"location": pair["location"], "categories": pair["categories"]}
+        if _has_fresh(parsed):
+            stats["fresh"] += 1
+            continue
+        if refresh(parsed):
+            stats["refreshed"] += 1
+        else:
+            stats["deferred"] += 1
+            break
+    return stats
+
+
+def _loop(interval: int) -> None:
+    while True:
+        try:
+            print("🔥 Cache warm pass:", warm_once())
+        except Exception as e:
+            print("Cache warm pass failed:", e)
+        time.sleep(interval)
+
+
+def start_warmer(interval: int = WARM_INTERVAL_S) -> threading.Thread:
+    """Start the warming loop in a daemon thread."""
+    t = threading.Thread(target=_loop, args=(interval,), name="cache-warmer", daemon=True)
+    t.start()
+    return t
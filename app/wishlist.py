@@ -2,12 +2,10 @@
 Wishlist logic: Reference the restaurants collection and support candidate list confirmation.
 """
 from datetime import datetime
-import re
 from typing import List, Dict
 from fastapi import APIRouter
 
-from bson import ObjectId
-from .db import coll as rest_coll, wishlist_coll          # restaurants, wishlists
+from .storage import get_storage                          # restaurants, wishlists
 from .yelp import search_yelp
 
 router = APIRouter()
@@ -17,11 +15,11 @@ router = APIRouter()
 # ──────────────────────────────────────────────
 def _search_candidates(name: str, location="Los Angeles") -> List[Dict]:
     """
-    ① First, use regex to find up to 5 entries in the local restaurants collection.
+    ① First, find up to 5 entries by name in the local restaurants store.
     ② If fewer than 5 are found, call the Yelp API for an exact search, write the results to the local database, and return them.
     """
-    regex = {"$regex": f"{re.escape(name)}", "$options": "i"}
-    docs  = list(rest_coll.find({"name": regex}).limit(5))
+    rest_repo = get_storage().restaurants
+    docs = rest_repo.find_by_name(name, limit=5)
     if docs:
         return docs
 
@@ -34,9 +32,9 @@ def _search_candidates(name: str, location="Los Angeles") -> List[Dict]:
             "img": b.get("image_url", ""),
             "rating": b.get("rating"),
             "url": b.get("url", ""),
+            "fetched_at": datetime.utcnow(),
         }
-        rest_coll.update_one({"yelp_id": b["id"]}, {"$setOnInsert": doc}, upsert=True)
-        docs.append(rest_coll.find_one({"yelp_id": b["id"]}))
+        docs.append(rest_repo.upsert(doc, overwrite=False))
     return docs
 
 
@@ -45,24 +43,19 @@ def _search_candidates(name: str, location="Los Angeles") -> List[Dict]:
 # ──────────────────────────────────────────────
 def add_to_wishlist(restaurant_name: str, note: str = "", user_id="default", cand_id: str = None):
     if cand_id:
-        r = rest_coll.find_one({"_id": ObjectId(cand_id)})
+        store = get_storage()
+        r = store.restaurants.get(cand_id)
         if not r:
             return f"❌ Candidate not found."
-        if wishlist_coll.find_one({"user_id": user_id, "restaurant_id": r["_id"]}):
+        if store.wishlists.find(r["_id"], user_id):
             return f"⚠️ **{r['name']}** is already in your wishlist."
-        wishlist_coll.insert_one({
-            "user_id": user_id,
-            "restaurant_id": r["_id"],
-            "restaurant_name": r["name"],
-            "note": note,
-            "added_at": datetime.utcnow(),
-        })
+        store.wishlists.add(r["_id"], r["name"], note, user_id)
         return f"✅ **{r['name']}** has been added to your wishlist."
 
     cands = _search_candidates(restaurant_name)
     if len(cands) == 1:
         r = cands[0]
-        return add_to_wishlist(restaurant_name, note, user_id, str(r["_id"]))
+        return add_to_wishlist(restaurant_name, note, user_id, r["_id"])
 
     follow = f"I found these matches for **{restaurant_name}**. Which one did you mean?\n\n"
     for i, r in enumerate(cands, 1):
@@ -74,46 +67,36 @@ def add_to_wishlist(restaurant_name: str, note: str = "", user_id="default", can
 
 
 
+def _find_one(restaurant_name: str):
+    found = get_storage().restaurants.find_by_name(restaurant_name, limit=1)
+    return found[0] if found else None
+
+
 def delete_from_wishlist(restaurant_name: str, user_id="default"):
-    regex = {"$regex": f"{re.escape(restaurant_name)}", "$options": "i"}
-    rest  = rest_coll.find_one({"name": regex})
+    rest  = _find_one(restaurant_name)
     if not rest:
         return f"⚠️ I couldn’t find **{restaurant_name}**."
-    res = wishlist_coll.delete_one({"user_id": user_id, "restaurant_id": rest["_id"]})
-    if res.deleted_count:
+    if get_storage().wishlists.remove(rest["_id"], user_id):
         return f"❌ **{rest['name']}** has been removed from your wishlist."
     return f"⚠️ **{rest['name']}** was not in your wishlist."
 
 
 def update_note(restaurant_name: str, new_note: str, user_id="default"):
-    regex = {"$regex": f"{re.escape(restaurant_name)}", "$options": "i"}
-    rest  = rest_coll.find_one({"name": regex})
+    rest  = _find_one(restaurant_name)
     if not rest:
         return f"⚠️ I couldn’t find **{restaurant_name}**."
-    res = wishlist_coll.update_one(
-        {"user_id": user_id, "restaurant_id": rest["_id"]},
-        {"$set": {"note": new_note}},
-    )
-    if res.matched_count == 0:
+    if not get_storage().wishlists.set_note(rest["_id"], new_note, user_id):
         return f"⚠️ **{rest['name']}** is not in your wishlist."
     return f"📝 Note for **{rest['name']}** updated to: {new_note}"
 
 
 def get_wishlist(user_id="default") -> str:
-    pipeline = [
-        {"$match": {"user_id": user_id}},
-        {
-            "$lookup": {
-                "from": "restaurants",
-                "localField": "restaurant_id",
-                "foreignField": "_id",
-                "as": "rest",
-            }
-        },
-        {"$unwind": "$rest"},
-        {"$sort": {"added_at": -1}},
-    ]
-    items = list(wishlist_coll.aggregate(pipeline))
+    store = get_storage()
+    items = []
+    for it in store.wishlists.items(user_id):          # newest first
+        rest = store.restaurants.get(it["restaurant_id"])
+        if rest:
+            items.append({**it, "rest": rest})
     if not items:
         return "📭 Your wishlist is currently empty."
     resp = "📌 **Here’s your wishlist:**\n\n"
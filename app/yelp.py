@@ -1,12 +1,13 @@
 import requests
 from .config import YELP_API_KEY
+from .query import price_tiers
 
 headers = {"Authorization": f"Bearer {YELP_API_KEY}"}
 
 def search_yelp(q: dict, limit=5):
     """
-    q: {'categories': 'sushi', 'location': 'San Francisco', 'rating': 4}
-    rating 只能在本地过滤，Yelp API 不支持 >=rating。
+    q: {'categories': 'sushi', 'location': 'San Francisco', 'rating': 4, 'price': '$$'}
+    price 直接传给 Yelp；rating 只能在本地过滤（query.filter_results），Yelp API 不支持 >=rating。
     """
     params = {
         "term": q.get("categories", "restaurant"),
@@ -14,6 +15,9 @@ def search_yelp(q: dict, limit=5):
         "limit": limit,
         "sort_by": "rating"
     }
+    tiers = price_tiers(q.get("price"))
+    if tiers:
+        params["price"] = ",".join(str(len(t)) for t in tiers)   # "$$" → "2"
     r = requests.get("https://api.yelp.com/v3/businesses/search",
                      headers=headers, params=params, timeout=10)
     r.raise_for_status()
@@ -0,0 +1,5 @@
+import pathlib
+import sys
+
+# make `app` importable when running plain `pytest` from the repo root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
@@ -0,0 +1,33 @@
+import datetime
+
+import pytest
+
+pytest.importorskip("dotenv")   # app.history reads its defaults from app.config
+
+from app import history
+from app.storage import set_storage
+from app.storage.sqlite import SqliteStorage
+
+
+@pytest.fixture
+def store():
+    s = SqliteStorage(":memory:")
+    set_storage(s)
+    yield s
+    set_storage(None)
+
+
+def test_archive_counts_each_session_once_across_batches(store):
+    old = datetime.datetime.utcnow() - datetime.timedelta(days=400)
+    for i in range(25):
+        store.conversations.insert({
+            "session_id": "s1" if i % 5 else "s2",
+            "user_input": f"q{i}",
+            "intent": "search",
+            "timestamp": old + datetime.timedelta(minutes=i),
+        })
+
+    stats = history.archive_old_turns(older_than_days=30, batch_size=7)
+
+    assert stats == {"archived": 25, "sessions": 2}
+    assert store.conversations.oldest_before(datetime.datetime.utcnow(), 100) == []
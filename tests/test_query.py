@@ -0,0 +1,115 @@
+"""Query builder + ``search_topk`` index checks.
+
+The ``explain()`` tests need a reachable MongoDB (``MONGO_URI``, default
+localhost) and are skipped otherwise; they run against a throw‑away database.
+"""
+
+import os
+import uuid
+
+import pytest
+
+from app.query import (
+    SEARCH_TOPK_INDEX,
+    SEARCH_TOPK_INDEX_NAME,
+    build_restaurant_query,
+    explain_top_k,
+    filter_results,
+    min_rating,
+    price_tiers,
+)
+
+# ───────────────────────────── pure helpers ──────────────────────────────
+
+@pytest.mark.parametrize("value, expected", [
+    (4, 4.0), ("4.5", 4.5), ("4+ stars", 4.0), (None, None), ("great", None), (True, None),
+])
+def test_min_rating(value, expected):
+    assert min_rating(value) == expected
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("$$", ["$$"]),
+    ("$-$$$", ["$", "$$", "$$$"]),
+    ("$, $$", ["$", "$$"]),
+    (["$$", "$"], ["$", "$$"]),
+    (2, ["$$"]),
+    (None, []),
+    ("$$$$$", []),
+])
+def test_price_tiers(value, expected):
+    assert price_tiers(value) == expected
+
+
+def test_build_restaurant_query():
+    q = build_restaurant_query(
+        {"location": "LA", "categories": ["sushi", "ramen"], "rating": "4+", "price": "$-$$"}
+    )
+    assert q == {
+        "location": "LA",
+        "categories": {"$in": ["sushi", "ramen"]},
+        "rating": {"$gte": 4.0},
+        "price": {"$in": ["$", "$$"]},
+    }
+    assert build_restaurant_query({"location": "LA", "categories": "sushi"}) == {
+        "location": "LA", "categories": "sushi",
+    }
+
+
+def test_filter_results_matches_cache_semantics():
+    rows = [
+        {"name": "a", "rating": 3.5, "price": "$$$$"},
+        {"name": "b", "rating": 4.6, "price": "$$", "review_count": 3},
+        {"name": "c", "rating": 4.6, "price": "$$", "review_count": 9},
+        {"name": "d", "rating": 4.9, "price": None},
+    ]
+    out = filter_results(rows, {"rating": 4.5, "price": "$$"})
+    assert [r["name"] for r in out] == ["c", "b"]
+
+# ───────────────────────────── explain() ─────────────────────────────────
+
+@pytest.fixture(scope="module")
+def coll():
+    pymongo = pytest.importorskip("pymongo")
+    client = pymongo.MongoClient(
+        os.getenv("MONGO_URI", "mongodb://localhost:27017/"), serverSelectionTimeoutMS=1000
+    )
+    try:
+        client.admin.command("ping")
+    except pymongo.errors.PyMongoError:
+        pytest.skip("MongoDB not reachable")
+
+    name = f"yelp_cache_test_{uuid.uuid4().hex[:8]}"
+    c = client[name]["restaurants"]
+    # same indexes as app/db.py, so the planner has the same competitors
+    c.create_index([("location", 1)])
+    c.create_index([("categories", 1)])
+    c.create_index([("rating", 1)])
+    c.create_index(SEARCH_TOPK_INDEX, name=SEARCH_TOPK_INDEX_NAME)
+    c.insert_many([
+        {
+            "location": ["LA", "SF", "NYC"][i % 3],
+            "categories": [["sushi"], ["ramen"], ["sushi", "ramen"], "pizza"][i % 4],
+            "rating": 3 + (i % 5) / 2,
+            "review_count": i,
+            "price": "$" * (1 + i % 4),
+        }
+        for i in range(600)
+    ])
+    yield c
+    client.drop_database(name)
+    client.close()
+
+
+@pytest.mark.parametrize("parsed", [
+    {"location": "LA", "categories": "sushi"},
+    {"location": "LA", "categories": "sushi", "rating": 4.5},
+    {"location": "LA", "categories": "sushi", "price": "$$"},
+    {"location": "LA", "categories": "sushi", "rating": "4+", "price": "$-$$"},
+    {"location": "LA", "categories": ["sushi", "ramen"]},
+    {"location": "LA", "categories": ["sushi", "ramen"], "rating": 4, "price": ["$", "$$$"]},
+], ids=["pair", "rating", "price", "rating+price", "in", "in+rating+price"])
+def test_top_k_uses_search_topk_without_blocking_sort(coll, parsed):
+    plan = explain_top_k(coll, parsed)
+    assert plan["index"] == SEARCH_TOPK_INDEX_NAME, plan
+    assert not plan["blocking_sort"], plan
@@ -0,0 +1,157 @@
+"""LLMScheduler with fake callables: ordering, shedding, coalescing, debounce."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.scheduler import BATCH, FOLLOWUP, INTERACTIVE, SUMMARY, LLMOverloaded, LLMScheduler
+
+DEADLINES = {INTERACTIVE: 10.0, FOLLOWUP: 10.0, SUMMARY: 10.0, BATCH: 10.0}
+
+
+def _scheduler(concurrency=1, rate_per_min=6000, debounce_s=2.0):
+    return LLMScheduler(concurrency, rate_per_min, debounce_s, dict(DEADLINES))
+
+
+def _wait_until(cond, timeout=2.0):
+    end = time.monotonic() + timeout
+    while not cond():
+        assert time.monotonic() < end, "condition not reached"
+        time.sleep(0.005)
+
+
+@pytest.fixture
+def pool():
+    with ThreadPoolExecutor(max_workers=8) as p:
+        yield p
+
+
+def _hold(s, pool):
+    """Occupy the only slot of *s* until the returned event is set."""
+    release = threading.Event()
+    fut = pool.submit(s.submit, lambda: release.wait(5) and "held")
+    _wait_until(lambda: s._active == 1)
+    return release, fut
+
+# ───────────────────────────── ordering ──────────────────────────────────
+
+def test_waiting_calls_run_in_priority_order(pool):
+    s = _scheduler()
+    release, held = _hold(s, pool)
+
+    order = []
+    futs = []
+    for n, prio in enumerate([BATCH, SUMMARY, INTERACTIVE, FOLLOWUP, INTERACTIVE], start=1):
+        futs.append(pool.submit(s.submit, lambda p=prio, n=n: order.append((p, n)), prio))
+        _wait_until(lambda n=n: len(s._queue) == n)
+
+    release.set()
+    assert held.result(2) == "held"
+    for f in futs:
+        f.result(2)
+    # by priority, FIFO within a class
+    assert order == [(INTERACTIVE, 3), (INTERACTIVE, 5), (FOLLOWUP, 4), (SUMMARY, 2), (BATCH, 1)]
+
+# ───────────────────────────── shedding ──────────────────────────────────
+
+def test_sheds_immediately_when_estimated_wait_exceeds_deadline(pool):
+    s = _scheduler()
+    release, held = _hold(s, pool)
+    s._latency = 1.0                             # one call ahead ≈ 1 s
+
+    t0 = time.monotonic()
+    with pytest.raises(LLMOverloaded, match="estimated"):
+        s.submit(lambda: "never", INTERACTIVE, deadline=0.5)
+    assert time.monotonic() - t0 < 0.2
+    assert s._queue == []
+
+    release.set()
+    held.result(2)
+
+
+def test_sheds_when_not_started_before_deadline(pool):
+    s = _scheduler()
+    release, held = _hold(s, pool)
+    s._latency = 0.01                            # estimate admits it, the slot never frees
+
+    t0 = time.monotonic()
+    with pytest.raises(LLMOverloaded, match="not started"):
+        s.submit(lambda: "never", INTERACTIVE, deadline=0.1)
+    assert 0.09 <= time.monotonic() - t0 < 1.0
+    assert s._queue == []
+
+    release.set()
+    held.result(2)
+    assert s.submit(lambda: "ok") == "ok"        # a shed waiter leaves no stale ticket
+
+
+def test_sheds_when_rate_budget_is_spent():
+    s = _scheduler(concurrency=4, rate_per_min=1)
+    assert s.submit(lambda: 1) == 1
+    with pytest.raises(LLMOverloaded):
+        s.submit(lambda: 2, BATCH, deadline=1.0)  # next token is ~60 s away
+
+# ───────────────────────────── coalescing ────────────────────────────────
+
+def test_keyed_calls_share_one_inflight_result(pool):
+    s = _scheduler(concurrency=4)
+    calls = []
+    release = threading.Event()
+
+    def fn():
+        calls.append(1)
+        release.wait(5)
+        return {"answer": 42}
+
+    owner = pool.submit(s.submit, fn, INTERACTIVE, None, "k")
+    _wait_until(lambda: "k" in s._inflight)
+    followers = [pool.submit(s.submit, fn, INTERACTIVE, None, "k") for _ in range(3)]
+    time.sleep(0.05)
+    release.set()
+
+    results = [f.result(2) for f in [owner, *followers]]
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+    assert s._inflight == {}
+
+
+def test_followers_get_the_owners_exception(pool):
+    s = _scheduler(concurrency=4)
+    calls = []
+    release = threading.Event()
+
+    def boom():
+        calls.append(1)
+        release.wait(5)
+        raise RuntimeError("upstream failed")
+
+    owner = pool.submit(s.submit, boom, INTERACTIVE, None, "k")
+    _wait_until(lambda: "k" in s._inflight)
+    follower = pool.submit(s.submit, boom, INTERACTIVE, None, "k")
+    time.sleep(0.05)
+    release.set()
+
+    for f in (owner, follower):
+        with pytest.raises(RuntimeError, match="upstream failed"):
+            f.result(2)
+    assert len(calls) == 1
+    assert s._inflight == {} and "k" not in s._recent   # failures are not debounced
+    assert s.submit(lambda: "retry", key="k") == "retry"
+
+
+def test_recent_results_expire_after_debounce_window():
+    s = _scheduler(concurrency=4, debounce_s=0.1)
+    calls = []
+
+    def fn():
+        calls.append(1)
+        return len(calls)
+
+    assert s.submit(fn, key="k") == 1
+    assert s.submit(fn, key="k") == 1            # reused within the window
+    assert s.submit(fn, key="other") == 2        # keys are independent
+    time.sleep(0.15)
+    assert s.submit(fn, key="k") == 3
+    assert s.submit(fn) == 4                     # unkeyed calls always run
@@ -0,0 +1,225 @@
+"""Embedded SQLite backend (``SqliteStorage(":memory:")``) behaviour + lookup latency."""
+
+import datetime
+import statistics
+import time
+
+import pytest
+
+from app.storage.sqlite import SqliteStorage
+
+NOW = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def store():
+    return SqliteStorage(":memory:")
+
+
+def _rest(i, **kw):
+    doc = {
+        "yelp_id": f"y{i}",
+        "name": f"Place {i}",
+        "location": "LA",
+        "categories": ["sushi"],
+        "rating": 4.0,
+        "review_count": i,
+        "price": "$$",
+        "fetched_at": NOW,
+    }
+    doc.update(kw)
+    return doc
+
+# ───────────────────────────── restaurants ───────────────────────────────
+
+def test_top_k_filters_and_orders(store):
+    r = store.restaurants
+    r.upsert(_rest(1, rating=4.5, review_count=10))
+    r.upsert(_rest(2, rating=4.5, review_count=50))
+    r.upsert(_rest(3, rating=3.5))
+    r.upsert(_rest(4, rating=4.8, price="$$$$"))
+    r.upsert(_rest(5, rating=5.0, location="SF"))
+
+    got = r.top_k({"location": "LA", "categories": "sushi", "rating": "4+", "price": "$-$$"})
+    assert [d["yelp_id"] for d in got] == ["y2", "y1"]
+
+    got = r.top_k({"location": "LA", "categories": "sushi"}, k=2)
+    assert [d["yelp_id"] for d in got] == ["y4", "y2"]
+
+
+def test_top_k_category_in_matching(store):
+    r = store.restaurants
+    r.upsert(_rest(1, categories=["sushi", "ramen"], rating=4.1))
+    r.upsert(_rest(2, categories="ramen", rating=4.9))
+    r.upsert(_rest(3, categories=["pizza"], rating=5.0))
+
+    got = r.top_k({"location": "LA", "categories": ["ramen", "tacos"]})
+    assert [d["yelp_id"] for d in got] == ["y2", "y1"]
+    assert [d["yelp_id"] for d in r.top_k({"location": "LA", "categories": "sushi"})] == ["y1"]
+    assert r.top_k({"location": "LA", "categories": None}) == []
+
+
+def test_upsert_overwrite_false_keeps_existing(store):
+    r = store.restaurants
+    first = r.upsert(_rest(1, name="Old"))
+    again = r.upsert(_rest(1, name="New", categories=["ramen"]), overwrite=False)
+    assert again["_id"] == first["_id"] and again["name"] == "Old"
+    assert r.top_k({"location": "LA", "categories": "ramen"}) == []
+
+    updated = r.upsert(_rest(1, name="New", categories=["ramen"]))
+    assert updated["_id"] == first["_id"] and updated["name"] == "New"
+    assert [d["name"] for d in r.top_k({"location": "LA", "categories": "ramen"})] == ["New"]
+    assert updated["fetched_at"] == NOW
+
+
+def test_get_and_valid_id(store):
+    r = store.restaurants
+    rid = r.upsert(_rest(1))["_id"]
+    assert r.get(rid)["yelp_id"] == "y1"
+    assert r.get("999") is None
+    assert r.get("not-an-id") is None
+    assert r.valid_id(rid) and not r.valid_id("not-an-id")
+
+
+def test_has_fresh_and_touch(store):
+    r = store.restaurants
+    r.upsert(_rest(1, fetched_at=NOW - datetime.timedelta(days=3)))
+    assert not r.has_fresh("LA", ["sushi"], NOW - datetime.timedelta(days=1))
+    r.touch("LA", ["sushi", "ramen"], NOW)
+    assert r.has_fresh("LA", "sushi", NOW - datetime.timedelta(days=1))
+
+# ───────────────────────────── wishlists ─────────────────────────────────
+
+@pytest.mark.parametrize("user_id", [None, "u1"])
+def test_wishlist_add_find_note_remove(store, user_id):
+    w = store.wishlists
+    w.add("7", "Sushi Place", "try omakase", user_id)
+    w.add("8", "Ramen Place", "", "someone-else")
+
+    found = w.find("7", user_id)
+    assert found["restaurant_name"] == "Sushi Place" and found["note"] == "try omakase"
+    assert [d["restaurant_id"] for d in w.items(user_id)] == (["7"] if user_id else ["8", "7"])
+
+    assert w.set_note("7", "lunch only", user_id)
+    assert w.find("7", user_id)["note"] == "lunch only"
+    assert not w.set_note("9", "x", user_id)
+
+    assert w.remove("7", user_id)
+    assert w.find("7", user_id) is None
+    assert not w.remove("7", user_id)
+
+
+def test_wishlist_user_scoping(store):
+    w = store.wishlists
+    w.add("7", "Sushi Place", user_id="u1")
+    assert w.find("7", "u2") is None
+    assert not w.remove("7", "u2")
+    assert w.find("7") is not None
+
+# ───────────────────────────── conversations ─────────────────────────────
+
+def test_page_keyset_with_timestamp_ties(store):
+    c = store.conversations
+    for i in range(5):
+        ts = NOW if i < 3 else NOW + datetime.timedelta(seconds=i)   # three turns share a timestamp
+        c.insert({"session_id": "s", "user_input": f"q{i}", "timestamp": ts})
+    c.insert({"session_id": "other", "user_input": "x", "timestamp": NOW})
+
+    seen, before = [], None
+    while True:
+        page = c.page("s", before, limit=2)
+        seen += [d["user_input"] for d in page]
+        if len(page) < 2:
+            break
+        before = (page[-1]["timestamp"], page[-1]["_id"])
+    assert seen == ["q4", "q3", "q2", "q1", "q0"]
+
+
+def test_page_rejects_malformed_cursor(store):
+    with pytest.raises(ValueError):
+        store.conversations.page("s", (NOW, "not-an-id"))
+
+
+def test_merge_rollups_and_delete(store):
+    c = store.conversations
+    old = NOW - datetime.timedelta(days=90)
+    for i in range(4):
+        c.insert({"session_id": "s", "user_input": f"q{i}", "intent": "search",
+                  "timestamp": old + datetime.timedelta(minutes=i)})
+    c.insert({"session_id": "s", "user_input": "recent", "timestamp": NOW})
+
+    docs = c.oldest_before(NOW - datetime.timedelta(days=30), 10)
+    assert [d["user_input"] for d in docs] == ["q0", "q1", "q2", "q3"]
+
+    for batch in (docs[:2], docs[2:]):
+        c.merge_rollups({"s": {
+            "turns": len(batch), "first": batch[0]["timestamp"], "last": batch[-1]["timestamp"],
+            "intents": {"search": len(batch)}, "inputs": [d["user_input"] for d in batch],
+        }}, keep_inputs=3)
+        c.delete(d["_id"] for d in batch)
+
+    row = dict(c.db.one("SELECT * FROM conversation_rollups WHERE session_id = 's'"))
+    assert row["turns"] == 4
+    assert row["first_ts"] == old.isoformat()
+    assert row["last_ts"] == (old + datetime.timedelta(minutes=3)).isoformat()
+    assert row["intents"] == '{"search": 4}'
+    assert row["recent_inputs"] == '["q1", "q2", "q3"]'
+    assert [d["user_input"] for d in c.page("s")] == ["recent"]
+
+
+def test_demand_counts_misses(store):
+    c = store.conversations
+    since = NOW - datetime.timedelta(hours=1)
+    for source, cats in [("yelp", ["sushi"]), ("yelp", ["sushi"]), ("mongo", ["sushi"]),
+                         ("mongo", "pizza"), ("mongo", "pizza"), ("mongo", "pizza")]:
+        c.insert({"session_id": "s", "intent": "search", "timestamp": NOW, "source": source,
+                  "parsed": {"location": "LA", "categories": cats}})
+    c.insert({"session_id": "s", "intent": "search", "timestamp": NOW - datetime.timedelta(hours=2),
+              "source": "yelp", "parsed": {"location": "LA", "categories": "tacos"}})
+    c.insert({"session_id": "s", "intent": "smalltalk", "timestamp": NOW,
+              "parsed": {"location": "LA", "categories": "tacos"}})
+
+    assert c.demand(since, 10) == [
+        {"location": "LA", "categories": ["sushi"], "hits": 3, "misses": 2},
+        {"location": "LA", "categories": "pizza", "hits": 3, "misses": 0},
+    ]
+
+# ───────────────────────────── intent cache ──────────────────────────────
+
+def test_intent_cache_load_many(store):
+    ic = store.intent_cache
+    ic.save("Find sushi in LA", "find sushi in la", "", "search")
+    got = ic.load_many(["find SUSHI in LA!", "show my wishlist", "Find sushi in LA"])
+    assert set(got) == {"find SUSHI in LA!", "Find sushi in LA"}
+    assert got["Find sushi in LA"]["intent"] == "search"
+    assert ic.load("Find sushi in LA")["hits"] == 3
+    assert ic.load_many([]) == {}
+
+# ───────────────────────────── lookup latency ────────────────────────────
+
+def _median_us(fn, n=500) -> float:
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples) * 1e6
+
+
+def test_lookup_latency(store):
+    """A few thousand restaurants: indexed lookups stay well under a millisecond."""
+    r = store.restaurants
+    cities, cats = ["LA", "SF", "NYC", "Austin"], ["sushi", "ramen", "pizza", "tacos", "thai"]
+    ids = [
+        r.upsert(_rest(i, location=cities[i % 4], categories=[cats[i // 4 % 5], cats[(i // 4 + 1) % 5]],
+                       rating=3 + (i // 20 % 5) / 2, price="$" * (1 + i // 100 % 4)))["_id"]
+        for i in range(4000)
+    ]
+
+    get_us = _median_us(lambda i: r.get(ids[i * 7 % len(ids)]))
+    query = lambda i: {"location": cities[i % 4], "categories": cats[i // 4 % 5], "rating": 4, "price": "$$"}
+    assert all(len(r.top_k(query(i))) == 5 for i in range(20))
+    topk_us = _median_us(lambda i: r.top_k(query(i)))
+    print(f"\nsqlite get: {get_us:.0f} µs, top_k: {topk_us:.0f} µs (median, 4000 restaurants)")
+    assert get_us < 1000
+    assert topk_us < 2000